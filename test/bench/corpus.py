@@ -0,0 +1,109 @@
+import random
+
+from tf.fabric import Fabric
+
+# A SYNTHETIC CORPUS FOR BENCHMARKS
+#
+# books, chapters and verses as sections,
+# phrases of 1-4 words, some of them with a gap,
+# and edge features between words and phrases:
+#
+#   parent   every word to its phrase
+#   mother   phrases to a few preceding phrases
+#   crossref phrases to random phrases, with int values
+
+
+def makeCorpus(dirName, nSlots, seed=42):
+  random.seed(seed)
+  otype = {}
+  oslots = {}
+  text = {}
+  pos = {}
+  number = {}
+  book = {}
+  chapter = {}
+  verse = {}
+  words = ['a', 'bb', 'ccc', 'dd', 'e\\e', ''] + [f'w{i}' for i in range(1000)]
+  for n in range(1, nSlots + 1):
+    otype[n] = 'word'
+    text[n] = random.choice(words)
+    pos[n] = random.choice(('noun', 'verb', 'prep', 'art', 'conj'))
+    number[n] = n % 13
+
+  node = nSlots
+
+  def addNode(nType, slots):
+    nonlocal node
+    node += 1
+    otype[node] = nType
+    oslots[node] = set(slots)
+    return node
+
+  bookSize = max(nSlots // 4, 1)
+  for (i, s) in enumerate(range(1, nSlots + 1, bookSize)):
+    book[addNode('book', range(s, min(s + bookSize, nSlots + 1)))] = f'B{i + 1}'
+  for s in range(1, nSlots + 1, 500):
+    chapter[addNode('chapter', range(s, min(s + 500, nSlots + 1)))] = (s - 1) % bookSize // 500 + 1
+  for s in range(1, nSlots + 1, 20):
+    verse[addNode('verse', range(s, min(s + 20, nSlots + 1)))] = (s - 1) % 500 // 20 + 1
+
+  parent = {}
+  phrases = []
+  s = 1
+  while s <= nSlots:
+    size = random.randint(1, 4)
+    slots = list(range(s, min(s + size, nSlots + 1)))
+    if size == 4 and random.random() < 0.3:
+      slots.remove(s + 1)
+    p = addNode('phrase', slots)
+    phrases.append(p)
+    for w in slots:
+      parent[w] = {p}
+    s += size
+
+  mother = {}
+  crossref = {}
+  for (i, p) in enumerate(phrases):
+    if i:
+      mother[p] = {
+          phrases[random.randrange(max(i - 50, 0), i)] for k in range(random.randint(1, 5))
+      }
+    if random.random() < 0.2:
+      crossref[p] = {
+          phrases[random.randrange(len(phrases))]: random.choice((1, 2, 3))
+          for k in range(random.randint(1, 8))
+      }
+
+  metaData = {
+      '': dict(source='synthetic benchmark corpus'),
+      'otext': {
+          'sectionTypes': 'book,chapter,verse',
+          'sectionFeatures': 'book,chapter,verse',
+          'fmt:text-orig-full': '{text} ',
+      },
+      'otype': dict(valueType='str'),
+      'oslots': dict(valueType='str'),
+      'text': dict(valueType='str'),
+      'pos': dict(valueType='str'),
+      'number': dict(valueType='int'),
+      'book': dict(valueType='str'),
+      'chapter': dict(valueType='int'),
+      'verse': dict(valueType='int'),
+      'parent': dict(valueType='str'),
+      'mother': dict(valueType='str'),
+      'crossref': dict(valueType='int', edgeValues=True),
+  }
+  TF = Fabric(locations=dirName, silent=True)
+  return TF.save(
+      nodeFeatures=dict(
+          otype=otype,
+          text=text,
+          pos=pos,
+          number=number,
+          book=book,
+          chapter=chapter,
+          verse=verse,
+      ),
+      edgeFeatures=dict(oslots=oslots, parent=parent, mother=mother, crossref=crossref),
+      metaData=metaData,
+  )
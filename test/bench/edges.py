@@ -0,0 +1,96 @@
+import sys
+import io
+from contextlib import redirect_stdout
+from tempfile import TemporaryDirectory
+from timeit import default_timer as timer
+
+from tf.fabric import Fabric
+
+from corpus import makeCorpus
+
+# BENCHMARK EDGE LOOKUPS
+#
+# E.x.f() and E.x.t() on rows that are stored in canonical order
+# against the same calls on rows that are sorted on every call,
+# for all nodes, and in searches with edge relations.
+#
+# usage: python edges.py [number of slots]
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+EDGES = ('parent', 'mother', 'crossref')
+
+QUERIES = (
+    '''
+word
+-parent> phrase
+''',
+    '''
+p:phrase
+q:phrase
+r:phrase
+p -mother> q
+r -mother> q
+''',
+    '''
+phrase
+-crossref=2> phrase
+''',
+    '''
+phrase
+<crossref- phrase
+''',
+)
+
+
+def setOrders(orders):
+  # an edge column without order gets its rows sorted on every call
+  for (data, order) in orders:
+    data.order = order
+
+
+def lookups(api):
+  maxNode = api.F.otype.maxNode
+  results = []
+  for eName in EDGES:
+    eObj = getattr(api.E, eName)
+    results.append(tuple(eObj.f(n) for n in range(1, maxNode + 1)))
+    results.append(tuple(eObj.t(n) for n in range(1, maxNode + 1)))
+  return results
+
+
+def searches(api):
+  return [sorted(api.S.search(query)) for query in QUERIES]
+
+
+def main():
+  print(f'{N} slots')
+  with TemporaryDirectory() as dirName:
+    with redirect_stdout(io.StringIO()):
+      makeCorpus(dirName, N)
+      TF = Fabric(locations=dirName, silent=True)
+      api = TF.load(' '.join(EDGES), silent=True)
+    orders = [
+        (data, data.order)
+        for eObj in (getattr(api.E, eName) for eName in EDGES)
+        for data in (eObj.data, eObj.dataInv)
+    ]
+    noOrders = [(data, None) for (data, order) in orders]
+    print(f'{"task":<10} {"sorting":>10} {"presorted":>10} {"speedup":>8}')
+    for (task, method) in (('lookups', lookups), ('searches', searches)):
+      setOrders(noOrders)
+      t0 = timer()
+      reference = method(api)
+      t1 = timer()
+      setOrders(orders)
+      result = method(api)
+      t2 = timer()
+      if result != reference:
+        print(f'{task}: DIFFERENT RESULTS')
+        return False
+      print(f'{task:<10} {t1 - t0:>9.2f}s {t2 - t1:>9.2f}s {(t1 - t0) / (t2 - t1):>7.1f}x')
+  return True
+
+
+if __name__ == '__main__':
+  sys.exit(0 if main() else 1)
@@ -0,0 +1,114 @@
+import sys
+import io
+from contextlib import redirect_stdout
+from tempfile import TemporaryDirectory
+from timeit import default_timer as timer
+
+from tf.fabric import Fabric
+
+from corpus import makeCorpus
+
+# BENCHMARK LOCALITY LOOKUPS
+#
+# L.u() and L.d() from the per type indexes
+# against the same calls done by scanning levUp, levDown and oslots on every call,
+# for all nodes, with and without a type, and in the patterns of display code.
+# The first indexed run includes making the indexes, the second one uses them.
+#
+# usage: python locality.py [number of slots]
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+TYPES = ('book', 'chapter', 'verse', 'phrase', 'word')
+
+
+def scanU(api, n, otype=None):
+  Fotype = api.F.otype
+  if n <= 0 or n > Fotype.maxNode:
+    return tuple()
+  levUp = api.C.levUp.data
+  if otype is None:
+    return levUp[n - 1]
+  return tuple(m for m in levUp[n - 1] if Fotype.v(m) == otype)
+
+
+def scanD(api, n, otype=None):
+  Fotype = api.F.otype
+  maxSlot = Fotype.maxSlot
+  if n <= maxSlot or n > Fotype.maxNode:
+    return tuple()
+  Eoslots = api.E.oslots
+  Crank = api.C.rank.data
+  levDown = api.C.levDown.data
+  if otype is None:
+    return tuple(sorted(levDown[n - maxSlot - 1] + Eoslots.s(n), key=lambda m: Crank[m - 1]))
+  elif otype == Fotype.slotType:
+    return tuple(sorted(Eoslots.s(n), key=lambda m: Crank[m - 1]))
+  return tuple(m for m in levDown[n - maxSlot - 1] if Fotype.v(m) == otype)
+
+
+def upward(api, u):
+  maxNode = api.F.otype.maxNode
+  return [tuple(u(n, otype) for n in range(1, maxNode + 1)) for otype in (None, ) + TYPES]
+
+
+def downward(api, d):
+  Fotype = api.F.otype
+  nodes = range(Fotype.maxSlot + 1, Fotype.maxNode + 1)
+  return [tuple(d(n, otype) for n in nodes) for otype in (None, ) + TYPES]
+
+
+def display(api, u, d):
+  # the section and the words of every phrase, then the phrases of every verse
+  Fotype = api.F.otype
+  results = []
+  for n in Fotype.s('phrase'):
+    results.append((u(n, 'book'), u(n, 'chapter'), u(n, 'verse'), d(n, 'word')))
+  for n in Fotype.s('verse'):
+    results.append((d(n, 'phrase'), d(n)))
+  return results
+
+
+def main():
+  print(f'{N} slots')
+  with TemporaryDirectory() as dirName:
+    with redirect_stdout(io.StringIO()):
+      makeCorpus(dirName, N)
+      TF = Fabric(locations=dirName, silent=True)
+      api = TF.load('', silent=True)
+    L = api.L
+
+    def u(n, otype=None):
+      return scanU(api, n, otype)
+
+    def d(n, otype=None):
+      return scanD(api, n, otype)
+
+    tasks = (
+        ('upward', lambda u, d: upward(api, u)),
+        ('downward', lambda u, d: downward(api, d)),
+        ('display', lambda u, d: display(api, u, d)),
+    )
+    print(f'{"task":<10} {"scanning":>10} {"indexing":>10} {"indexed":>10} {"speedup":>8}')
+    for (task, method) in tasks:
+      L._indexes.clear()
+      L._up = None
+      t0 = timer()
+      reference = method(u, d)
+      t1 = timer()
+      result = method(L.u, L.d)
+      t2 = timer()
+      resultAgain = method(L.u, L.d)
+      t3 = timer()
+      if result != reference or resultAgain != reference:
+        print(f'{task}: DIFFERENT RESULTS')
+        return False
+      print(
+          f'{task:<10} {t1 - t0:>9.2f}s {t2 - t1:>9.2f}s {t3 - t2:>9.2f}s'
+          f' {(t1 - t0) / (t3 - t2):>7.1f}x'
+      )
+  return True
+
+
+if __name__ == '__main__':
+  sys.exit(0 if main() else 1)
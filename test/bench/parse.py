@@ -0,0 +1,126 @@
+import sys
+import os
+import collections
+import random
+from tempfile import TemporaryDirectory
+from timeit import default_timer as timer
+
+from tf.core.data import Data
+from tf.core.timestamp import Timestamp
+from tf.core.helpers import valueFromTf
+
+# BENCHMARK THE PARSING OF LARGE NODE FEATURES
+#
+# We generate node features with the characteristics of real corpus features
+# and read them with the parser of Text-Fabric and with a reference parser
+# that follows the generic algorithm: build a node set for every line,
+# take its maximum and decode every value.
+#
+# usage: python parse.py [number of nodes]
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+WORDS = [f'w{i}' for i in range(5000)] + ['a\\tb', 'c\\\\d', '']
+POS = ['noun', 'verb', 'prep', 'art', 'conj', 'subs', 'advb']
+
+
+def makeFeatures(dirName):
+  random.seed(42)
+  specs = dict(
+      # every node, implicit node spec, many distinct values, a few escapes
+      text=('str', [(None, random.choice(WORDS)) for n in range(N)]),
+      # every node, implicit node spec, few distinct values
+      pos=('str', [(None, random.choice(POS)) for n in range(N)]),
+      # every other node, explicit node spec
+      number=('int', [(str(n), str(n % 1000)) for n in range(1, N + 1, 2)]),
+      # ranges of nodes
+      chunk=('int', [(f'{n}-{n + 9}', str(n // 10)) for n in range(1, N + 1, 10)]),
+  )
+  for (fName, (valueType, lines)) in specs.items():
+    with open(f'{dirName}/{fName}.tf', 'w', encoding='utf8') as fh:
+      fh.write(f'@node\n@valueType={valueType}\n\n')
+      for (spec, value) in lines:
+        fh.write(f'{value}\n' if spec is None else f'{spec}\t{value}\n')
+  return sorted(specs)
+
+
+def setFromSpec(spec):
+  covered = set()
+  for r_str in spec.split(','):
+    bounds = r_str.split('-')
+    if len(bounds) == 1:
+      covered.add(int(r_str))
+    else:
+      b = int(bounds[0])
+      e = int(bounds[1])
+      if e < b:
+        (b, e) = (e, b)
+      for n in range(b, e + 1):
+        covered.add(n)
+  return covered
+
+
+def readReference(path):
+  with open(path, encoding='utf8') as fh:
+    isNum = False
+    for line in fh:
+      if line.startswith('@valueType=int'):
+        isNum = True
+      if line == '\n':
+        break
+    implicit_node = 1
+    data = {}
+    errors = collections.defaultdict(list)
+    for line in fh:
+      fields = line.rstrip('\n').split('\t')
+      lfields = len(fields)
+      if lfields > 2:
+        errors['wrongFields'].append(line)
+        continue
+      if lfields == 2:
+        nodes = setFromSpec(fields[0])
+        valTf = fields[-1]
+      else:
+        nodes = {implicit_node}
+        valTf = fields[0]
+      implicit_node = max(nodes) + 1
+      value = (
+          int(valTf) if isNum and valTf != '' else
+          None if isNum else '' if valTf == '' else valueFromTf(valTf)
+      )
+      for n in nodes:
+        if value is not None:
+          data[n] = value
+  return data
+
+
+def readTf(path):
+  fObj = Data(path, Timestamp())
+  fObj._readTf()
+  return fObj.data
+
+
+def main():
+  print(f'{N} nodes')
+  with TemporaryDirectory() as dirName:
+    fNames = makeFeatures(dirName)
+    print(f'{"feature":<10} {"size":>10} {"reference":>10} {"tf":>10} {"speedup":>8}')
+    for fName in fNames:
+      path = f'{dirName}/{fName}.tf'
+      size = os.path.getsize(path)
+      t0 = timer()
+      reference = readReference(path)
+      t1 = timer()
+      data = readTf(path)
+      t2 = timer()
+      if data != reference:
+        print(f'{fName}: DIFFERENT RESULTS')
+        return False
+      print(
+          f'{fName:<10} {size:>10} {t1 - t0:>9.2f}s {t2 - t1:>9.2f}s {(t1 - t0) / (t2 - t1):>7.1f}x'
+      )
+  return True
+
+
+if __name__ == '__main__':
+  sys.exit(0 if main() else 1)
@@ -0,0 +1,238 @@
+import os
+import sys
+import gzip
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from tf.fabric import Fabric
+from tf.core.columns import (
+    readColumns, columnFromSections, writeNodeColumn, writeEdgeColumn, compactNodeData, edgeColumn,
+    isColumnFile, NodeColumn, IntColumn, CodedColumn, EdgeColumn, RowColumn,
+)
+
+# LOAD THE TEST CORPUS
+
+TF = Fabric('tf')
+api = TF.load('name link distance role')
+F = api.F
+E = api.E
+C = api.C
+
+EDGES = ('link', 'distance', 'role')
+
+
+def inverseOf(data, doValues):
+  inverse = {}
+  for (n, row) in data.items():
+    for m in row:
+      if doValues:
+        inverse.setdefault(m, {})[n] = row[m]
+      else:
+        inverse.setdefault(m, set()).add(n)
+  return inverse
+
+
+def stored(dirName, fName, writer, *args):
+  path = os.path.join(dirName, f'{fName}.tfx')
+  writer(path, *args)
+  return columnFromSections(*readColumns(path))
+
+
+# DEFINE THE TESTS
+
+class edgeColumns(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.TemporaryDirectory()
+
+  def tearDown(self):
+    self.tmpDir.cleanup()
+
+  def edgeData(self, fName):
+    fObj = TF.features[fName]
+    return (dict(fObj.data.items()), fObj.dataType, fObj.edgeValues)
+
+  def test_roundTrip(self):
+    for fName in EDGES:
+      (data, dataType, doValues) = self.edgeData(fName)
+      column = edgeColumn(data, doValues)
+      self.assertEqual(dict(column.items()), data)
+      self.assertEqual(dict(column.inverse.items()), inverseOf(data, doValues))
+      back = stored(self.tmpDir.name, fName, writeEdgeColumn, column, dataType, doValues)
+      self.assertIs(type(back), EdgeColumn)
+      self.assertEqual(back.doValues, doValues)
+      self.assertEqual(len(back), len(data))
+      self.assertEqual(dict(back.items()), data)
+      self.assertEqual(dict(back.inverse.items()), inverseOf(data, doValues))
+      for n in range(0, F.otype.maxNode + 2):
+        self.assertEqual(back.row(n), column.row(n))
+        self.assertEqual(back.inverse.row(n), column.inverse.row(n))
+      del back
+
+  def test_fromDict(self):
+    for fName in EDGES:
+      (data, dataType, doValues) = self.edgeData(fName)
+      back = stored(self.tmpDir.name, fName, writeEdgeColumn, data, dataType, doValues)
+      self.assertEqual(dict(back.items()), data)
+      del back
+
+  def test_valueTables(self):
+    for (fName, valueType) in (('distance', int), ('role', str)):
+      (data, dataType, doValues) = self.edgeData(fName)
+      back = stored(self.tmpDir.name, fName, writeEdgeColumn, data, dataType, doValues)
+      self.assertIsNone(back.table[0])
+      self.assertEqual({type(v) for v in back.table[1:]}, {valueType})
+      self.assertEqual(set(back.table[1:]), {v for row in data.values() for v in row.values()})
+      del back
+    (data, dataType, doValues) = self.edgeData('link')
+    back = stored(self.tmpDir.name, 'link', writeEdgeColumn, data, dataType, doValues)
+    self.assertIsNone(back.table)
+    self.assertIsNone(back.codes)
+    del back
+
+  def test_rankSorted(self):
+    rank = C.rank.data
+
+    def byRank(row):
+      if type(row) is dict:
+        return tuple(sorted(row.items(), key=lambda x: rank[x[0] - 1]))
+      return tuple(sorted(row, key=lambda x: rank[x - 1]))
+
+    for fName in EDGES:
+      (data, dataType, doValues) = self.edgeData(fName)
+      column = edgeColumn(data, doValues).rankSorted(rank, 'test')
+      self.assertEqual(column.order, 'test')
+      self.assertEqual(column.inverse.order, 'test')
+      back = stored(self.tmpDir.name, fName, writeEdgeColumn, column, dataType, doValues)
+      self.assertEqual(back.order, 'test')
+      self.assertEqual(back.inverse.order, 'test')
+      self.assertEqual(dict(back.items()), data)
+      inverse = inverseOf(data, doValues)
+      for n in range(1, F.otype.maxNode + 1):
+        self.assertEqual(column.row(n), byRank(data.get(n, ())))
+        self.assertEqual(back.row(n), byRank(data.get(n, ())))
+        self.assertEqual(back.inverse.row(n), byRank(inverse.get(n, ())))
+      del back
+
+
+class nodeColumns(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.TemporaryDirectory()
+
+  def tearDown(self):
+    self.tmpDir.cleanup()
+
+  def test_roundTrip(self):
+    maxNode = F.otype.maxNode
+    cases = (
+        ('name', dict(F.name.data.items()), 'str', NodeColumn),
+        ('sparseInt', {n: n * 1000 for n in range(1, maxNode + 1, 20)}, 'int', NodeColumn),
+        ('denseInt', {n: n - 50 for n in range(1, maxNode + 1) if n % 7}, 'int', IntColumn),
+        ('coded', {n: F.otype.v(n) for n in range(1, maxNode + 1) if n % 5}, 'str', CodedColumn),
+    )
+    for (fName, data, dataType, columnType) in cases:
+      column = compactNodeData(data, dataType)
+      back = stored(self.tmpDir.name, fName, writeNodeColumn, column, dataType)
+      self.assertIs(type(back), columnType)
+      self.assertEqual(len(back), len(data))
+      self.assertEqual(dict(back.items()), data)
+      for n in range(-1, maxNode + 2):
+        self.assertEqual(back.get(n), data.get(n, None))
+      del back
+
+
+class compiledReloaded(unittest.TestCase):
+
+  def results(self, api):
+    (F, E) = (api.F, api.E)
+    nodes = range(1, F.otype.maxNode + 1)
+    typeSets = (None, {'sign'}, {'part'})
+    results = dict(
+        name=(F.name.vMany(nodes), [F.name.v(n) for n in nodes], F.name.freqList()),
+    )
+    for fName in EDGES:
+      feature = getattr(E, fName)
+      results[fName] = (
+          [feature.f(n) for n in nodes],
+          [feature.t(n) for n in nodes],
+          feature.fMany(nodes),
+          feature.tMany(nodes),
+          [
+              feature.freqList(nodeTypesFrom=nodeTypesFrom, nodeTypesTo=nodeTypesTo)
+              for nodeTypesFrom in typeSets for nodeTypesTo in typeSets
+          ],
+      )
+    return results
+
+  def test_compare(self):
+    with tempfile.TemporaryDirectory() as tmpDir:
+      for fName in ('otype', 'oslots', 'name') + EDGES:
+        shutil.copy(os.path.join('tf', f'{fName}.tf'), tmpDir)
+      features = ' '.join(('name', ) + EDGES)
+      results = []
+      for action in ('T', 'B'):
+        TFtmp = Fabric(tmpDir)
+        apiTmp = TFtmp.load(features, silent=True)
+        self.assertEqual(
+            {record['action'] for record in TFtmp.loadProfile() if record['feature'] in EDGES},
+            {action},
+        )
+        results.append(self.results(apiTmp))
+        del apiTmp
+        del TFtmp
+      self.assertEqual(results[1], results[0])
+      self.assertEqual(results[0], self.results(api))
+
+
+class legacyBinaries(unittest.TestCase):
+
+  def test_upgrade(self):
+    # binaries as earlier versions wrote them: the plain data, pickled
+    legacy = dict(
+        name=dict(F.name.data.items()),
+        link=dict(E.link.data.items()),
+        role=dict(E.role.data.items()),
+        __levUp__=tuple(C.levUp.data),
+    )
+    features = 'name link role'
+    with tempfile.TemporaryDirectory() as tmpDir:
+      for fName in ('otype', 'oslots', 'name', 'link', 'role'):
+        shutil.copy(os.path.join('tf', f'{fName}.tf'), tmpDir)
+      Fabric(tmpDir).load(features, silent=True)
+      binPaths = {fName: os.path.join(tmpDir, '.tf', f'{fName}.tfx') for fName in legacy}
+      for (fName, data) in legacy.items():
+        with gzip.open(binPaths[fName], 'wb') as f:
+          pickle.dump(data, f)
+
+      TFtmp = Fabric(tmpDir)
+      apiTmp = TFtmp.load(features, silent=True)
+      self.assertEqual(dict(apiTmp.F.name.data.items()), legacy['name'])
+      self.assertEqual(dict(apiTmp.E.link.data.items()), legacy['link'])
+      self.assertEqual(dict(apiTmp.E.role.data.items()), legacy['role'])
+      self.assertIs(type(apiTmp.C.levUp.data), RowColumn)
+      self.assertEqual(tuple(apiTmp.C.levUp.data), legacy['__levUp__'])
+      for fName in ('name', 'link', 'role'):
+        self.assertTrue(isColumnFile(binPaths[fName]))
+      modifieds = {fName: os.path.getmtime(path) for (fName, path) in binPaths.items()}
+      del apiTmp
+      del TFtmp
+
+      # the upgraded binaries are used as they are
+      TFtmp = Fabric(tmpDir)
+      apiTmp = TFtmp.load(features, silent=True)
+      self.assertIs(type(apiTmp.F.name.data), NodeColumn)
+      self.assertIs(type(apiTmp.E.link.data), EdgeColumn)
+      self.assertIs(type(apiTmp.C.levUp.data), RowColumn)
+      self.assertEqual(
+          {fName: os.path.getmtime(path) for (fName, path) in binPaths.items()}, modifieds
+      )
+      del apiTmp
+      del TFtmp
+
+
+if __name__ == '__main__':
+  unittest.main()
+  sys.exit()
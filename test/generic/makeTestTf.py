@@ -95,6 +95,42 @@ addPart('tome2n', [9, 10])
 addPart('tome2p', [5, 6])
 addPart('all', range(1, maxSlot + 1))
 
+# GENERATE EDGES
+
+nodeOf = {nm: n for (n, nm) in name.items() if n > maxSlot}
+
+# link: without values, between signs, from parts to signs and between parts
+
+link = {}
+for s in range(1, maxSlot):
+  link.setdefault(s, set()).add(s + 1)
+for i in range(1, maxSlot + 1):
+  link.setdefault(nodeOf[f's{i}'], set()).add(i)
+  link.setdefault(nodeOf[f'ss{i}'], set()).add(nodeOf[f's{i}'])
+
+# distance: with integer values
+
+distance = {}
+for s in range(1, maxSlot + 1):
+  for t in (s + 1, s + 2):
+    if t <= maxSlot:
+      distance.setdefault(s, {})[t] = t - s
+  distance.setdefault(nodeOf['all'], {})[s] = s % 3
+
+# role: with string values
+
+role = {}
+for s in range(1, maxSlot):
+  role[s] = {s + 1: 'next'}
+for i in range(1, maxSlot + 1):
+  role[nodeOf[f's{i}']] = {i: 'sign'}
+role[nodeOf['all']] = {
+    nodeOf['lower']: 'half',
+    nodeOf['upper']: 'half',
+    nodeOf['odd']: 'alternate',
+    nodeOf['even']: 'alternate',
+}
+
 # COLLECT THE FEATURES
 
 nodeFeatures = {
@@ -103,6 +139,9 @@ nodeFeatures = {
 }
 edgeFeatures = {
     'oslots': oslots,
+    'link': link,
+    'distance': distance,
+    'role': role,
 }
 
 metaData = {
@@ -121,6 +160,17 @@ metaData = {
     'name': {
         'valueType': 'str',
     },
+    'link': {
+        'valueType': 'str',
+    },
+    'distance': {
+        'valueType': 'int',
+        'edgeValues': True,
+    },
+    'role': {
+        'valueType': 'str',
+        'edgeValues': True,
+    },
 }
 
 # SAVE THE CORPUS AS TF
@@ -0,0 +1,410 @@
+import os
+import sys
+import glob
+import random
+import shutil
+import tempfile
+import functools
+import collections
+import unittest
+
+from tf.fabric import Fabric
+from tf.core import prepare
+from tf.core.data import Data
+from tf.core.manifest import writeManifest
+from tf.core.nodes import NodeSet
+from tf.core.columns import (
+    sequenceSections, sequenceFromSections, readColumns, columnFromSections, writeValueIndex,
+    compactNodeData, IntColumn, CodedColumn,
+)
+
+# LOAD THE TEST CORPUS
+
+TF = Fabric('tf')
+api = TF.load('name link distance role')
+F = api.F
+E = api.E
+C = api.C
+
+
+# THE ORIGINAL DEFINITION OF THE CANONICAL ORDER, AS A COMPARISON FUNCTION
+
+def referenceOrder(otype, oslots, levels):
+  (slotType, maxSlot) = (otype[-2], otype[-1])
+  maxNode = len(otype) - 2 + maxSlot
+  otypeLevels = dict(((x[0], i) for (i, x) in enumerate(levels)))
+
+  def otypeRank(n):
+    return otypeLevels[slotType if n < maxSlot + 1 else otype[n - maxSlot - 1]]
+
+  def before(na, nb):
+    sa = {na} if na < maxSlot + 1 else set(oslots[na - maxSlot - 1])
+    sb = {nb} if nb < maxSlot + 1 else set(oslots[nb - maxSlot - 1])
+    oa = otypeRank(na)
+    ob = otypeRank(nb)
+    if sa == sb:
+      return 0 if oa == ob else -1 if oa < ob else 1
+    if sa > sb:
+      return -1
+    if sa < sb:
+      return 1
+    am = min(sa - sb)
+    bm = min(sb - sa)
+    return -1 if am < bm else 1 if bm < am else None
+
+  return list(sorted(range(1, maxNode + 1), key=functools.cmp_to_key(before)))
+
+
+# THE ORIGINAL COMPUTATION OF THE EMBEDDERS, BY INTERSECTING SLOT SETS
+
+def referenceLevUp(otype, oslots, rank):
+  maxSlot = otype[-1]
+  maxNode = len(otype) - 2 + maxSlot
+  oslotsInv = {}
+  for (k, mList) in enumerate(oslots[0:-1]):
+    for m in mList:
+      oslotsInv.setdefault(m, set()).add(k + 1 + maxSlot)
+  embedders = []
+  for n in range(1, maxNode + 1):
+    mList = (n, ) if n <= maxSlot else oslots[n - maxSlot - 1]
+    contentEmbedders = functools.reduce(
+        lambda x, y: x & oslotsInv[y],
+        mList[1:],
+        oslotsInv[mList[0]],
+    )
+    embedders.append(
+        tuple(sorted((m for m in contentEmbedders if m != n), key=lambda k: -rank[k - 1]))
+    )
+  return tuple(embedders)
+
+
+def noInfo(*args, **kwargs):
+  pass
+
+
+# GENERATE A CORPUS WITH GAPS AND DUPLICATE SLOT SETS
+
+def randomCorpus(maxSlot, nNodes):
+  random.seed(42)
+  levels = (('big', ), ('mid', ), ('small', ), ('slot', ))
+  otype = []
+  oslots = []
+  for i in range(nNodes):
+    first = random.randint(1, maxSlot)
+    last = random.randint(first, min(first + 8, maxSlot))
+    slots = {first, last} | {s for s in range(first, last + 1) if random.random() < 0.5}
+    otype.append(random.choice(('big', 'mid', 'small')))
+    oslots.append(tuple(sorted(slots)))
+    if random.random() < 0.1:
+      otype.append(random.choice(('big', 'mid', 'small')))
+      oslots.append(oslots[-1])
+  otype.extend(('slot', maxSlot))
+  oslots.append(maxSlot)
+  return (tuple(otype), tuple(oslots), levels)
+
+
+# DEFINE THE TESTS
+
+class canonicalOrder(unittest.TestCase):
+
+  def test_corpus(self):
+    self.assertEqual(
+        list(C.order.data),
+        referenceOrder(F.otype.data, E.oslots.data, C.levels.data),
+    )
+
+  def test_gaps(self):
+    (otype, oslots, levels) = randomCorpus(50, 2000)
+    self.assertEqual(
+        list(prepare.order(noInfo, noInfo, otype, oslots, levels)),
+        referenceOrder(otype, oslots, levels),
+    )
+
+
+class embedders(unittest.TestCase):
+
+  def test_corpus(self):
+    self.assertEqual(
+        tuple(C.levUp.data),
+        referenceLevUp(F.otype.data, E.oslots.data, C.rank.data),
+    )
+
+  def test_gaps(self):
+    (otype, oslots, levels) = randomCorpus(50, 2000)
+    order = prepare.order(noInfo, noInfo, otype, oslots, levels)
+    rank = prepare.rank(noInfo, noInfo, otype, order)
+    self.assertEqual(
+        tuple(prepare.levUp(noInfo, noInfo, otype, oslots, levels, rank)),
+        referenceLevUp(otype, oslots, rank),
+    )
+
+
+class sequences(unittest.TestCase):
+
+  def roundTrip(self, data):
+    (spec, sections) = sequenceSections(data)
+    return sequenceFromSections(spec, dict(sections))
+
+  def test_warp(self):
+    for data in (F.otype.data, E.oslots.data):
+      self.assertEqual(tuple(self.roundTrip(data)), data)
+      self.assertEqual(self.roundTrip(data)[-1], data[-1])
+
+  def test_precomputed(self):
+    for data in (C.order.data, C.rank.data, C.levUp.data, C.levDown.data):
+      self.assertEqual(tuple(self.roundTrip(data)), tuple(data))
+    boundary = self.roundTrip(C.boundary.data)
+    self.assertEqual(tuple(tuple(part) for part in boundary), C.boundary.data)
+
+  def test_other(self):
+    self.assertIsNone(sequenceSections(C.levels.data))
+    self.assertIsNone(sequenceSections(({1: 2}, )))
+
+
+class valueIndexes(unittest.TestCase):
+
+  def referenceNodes(self, feature, val):
+    Crank = C.rank.data
+    return tuple(
+        sorted([n for (n, v) in feature.data.items() if v == val], key=lambda n: Crank[n - 1])
+    )
+
+  def test_lookup(self):
+    values = set(F.name.data.values())
+    self.assertEqual(set(F.name.valueIndex()), values)
+    for val in values:
+      self.assertEqual(F.name.s(val), self.referenceNodes(F.name, val))
+    self.assertEqual(F.name.s('no such value'), ())
+
+  def test_roundTrip(self):
+    index = F.name.valueIndex()
+    with tempfile.TemporaryDirectory() as tmpDir:
+      path = os.path.join(tmpDir, 'name.tfi')
+      writeValueIndex(path, index, 'str')
+      stored = columnFromSections(*readColumns(path))
+      self.assertEqual(stored.order, index.order)
+      self.assertEqual(dict(stored), dict(index))
+      del stored
+
+
+class manyValues(unittest.TestCase):
+
+  def nodeLists(self, maxNode):
+    # negative nodes on their own, because nodes beyond maxNode would also take the slow road
+    return ((-maxNode, -2, -1, 1, 2, maxNode), (0, 1, 2, maxNode, maxNode + 1))
+
+  def test_otype(self):
+    for nodes in self.nodeLists(F.otype.maxNode):
+      self.assertEqual(F.otype.vMany(nodes), [F.otype.v(n) for n in nodes])
+
+  def test_columns(self):
+    intData = {n: n * 10 for n in range(1, 20) if n % 3}
+    strData = {n: 'ab'[n % 2] for n in range(1, 20)}
+    cases = ((intData, 'int', IntColumn), (strData, 'str', CodedColumn))
+    for (data, dataType, columnType) in cases:
+      column = compactNodeData(data, dataType)
+      self.assertIs(type(column), columnType)
+      for nodes in self.nodeLists(19):
+        self.assertEqual(column.getMany(nodes), [data.get(n, None) for n in nodes])
+
+
+class edgeFreqs(unittest.TestCase):
+
+  def referenceFreqs(self, feature, nodeTypesFrom, nodeTypesTo):
+    fql = collections.Counter()
+    for n in range(1, F.otype.maxNode + 1):
+      if nodeTypesFrom is not None and F.otype.v(n) not in nodeTypesFrom:
+        continue
+      for x in feature.f(n):
+        (m, v) = x if feature.doValues else (x, None)
+        if nodeTypesTo is None or F.otype.v(m) in nodeTypesTo:
+          fql[v] += 1
+    if feature.doValues:
+      return tuple(sorted(fql.items(), key=lambda x: (-x[1], x[0])))
+    return fql[None]
+
+  def test_unvalued(self):
+    self.assertEqual(E.link.freqList(), 29)
+    self.assertEqual(E.link.freqList(nodeTypesFrom={'sign'}, nodeTypesTo={'sign'}), 9)
+    self.assertEqual(E.link.freqList(nodeTypesFrom={'part'}, nodeTypesTo={'sign'}), 10)
+    self.assertEqual(E.link.freqList(nodeTypesFrom={'part'}, nodeTypesTo={'part'}), 10)
+    self.assertEqual(E.link.freqList(nodeTypesFrom={'sign'}, nodeTypesTo={'part'}), 0)
+    self.assertEqual(E.link.freqList(nodeTypesTo={'sign'}), 19)
+
+  def test_valued(self):
+    self.assertEqual(E.distance.freqList(), ((1, 13), (2, 11), (0, 3)))
+    self.assertEqual(E.distance.freqList(nodeTypesFrom={'sign'}), ((1, 9), (2, 8)))
+    self.assertEqual(E.distance.freqList(nodeTypesFrom={'part'}), ((1, 4), (0, 3), (2, 3)))
+    self.assertEqual(
+        E.role.freqList(), (('sign', 10), ('next', 9), ('alternate', 2), ('half', 2))
+    )
+    self.assertEqual(
+        E.role.freqList(nodeTypesFrom={'part'}, nodeTypesTo={'part'}),
+        (('alternate', 2), ('half', 2)),
+    )
+    self.assertEqual(
+        E.role.freqList(nodeTypesFrom={'part'}, nodeTypesTo={'sign'}), (('sign', 10), )
+    )
+
+  def test_reference(self):
+    typeSets = (None, {'sign'}, {'part'}, {'sign', 'part'})
+    for feature in (E.link, E.distance, E.role):
+      for nodeTypesFrom in typeSets:
+        for nodeTypesTo in typeSets:
+          self.assertEqual(
+              feature.freqList(nodeTypesFrom=nodeTypesFrom, nodeTypesTo=nodeTypesTo),
+              self.referenceFreqs(feature, nodeTypesFrom, nodeTypesTo),
+          )
+
+  def test_cached(self):
+    fql = E.role.freqList(nodeTypesFrom={'part'})
+    self.assertIs(E.role.freqList(nodeTypesFrom=('part', )), fql)
+    self.assertIs(E.role.freqList(nodeTypesFrom={'part'}), fql)
+
+
+class nodeSets(unittest.TestCase):
+
+  def setUp(self):
+    random.seed(7)
+    nodes = range(1, F.otype.maxNode + 1)
+    self.a = set(random.sample(nodes, len(nodes) // 2))
+    self.b = set(random.sample(nodes, len(nodes) // 3))
+
+  def test_order(self):
+    self.assertEqual(list(NodeSet(api, self.a)), api.sortNodes(self.a))
+    self.assertEqual(api.sortNodes(api.nodeSet(self.a)), api.sortNodes(self.a))
+
+  def test_algebra(self):
+    (a, b) = (self.a, self.b)
+    (A, B) = (api.nodeSet(a), api.nodeSet(b))
+    self.assertEqual(list(A | B), api.sortNodes(a | b))
+    self.assertEqual(list(A & B), api.sortNodes(a & b))
+    self.assertEqual(list(A - B), api.sortNodes(a - b))
+    self.assertEqual(list(A | b), api.sortNodes(a | b))
+    self.assertEqual(A, a)
+
+  def test_nonNodes(self):
+    maxNode = F.otype.maxNode
+    for n in (0, -1, -maxNode, maxNode + 1):
+      self.assertEqual(len(api.nodeSet([n])), 0)
+      self.assertNotIn(n, api.nodeSet([n]))
+    self.assertEqual(
+        list(api.nodeSet([0, 1, -1, maxNode, maxNode + 1])), api.sortNodes([1, maxNode])
+    )
+    self.assertEqual(api.nodeSet(self.a) | [0, -2, maxNode + 1], self.a)
+
+  def test_membership(self):
+    A = api.nodeSet(self.a)
+    for n in range(0, F.otype.maxNode + 2):
+      self.assertEqual(n in A, n in self.a)
+    self.assertEqual(len(A), len(self.a))
+
+
+class slotTexts(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # the test corpus with an otext, so that there is a text api
+    cls.tmpDir = tempfile.TemporaryDirectory()
+    for fName in ('otype', 'oslots', 'name'):
+      shutil.copy(os.path.join('tf', f'{fName}.tf'), cls.tmpDir.name)
+    with open(os.path.join(cls.tmpDir.name, 'otext.tf'), 'w') as fh:
+      fh.write('@config\n@fmt:text-orig-full={name}-\n@fmt:text-orig-plain={name}\n\n')
+    cls.api = Fabric(cls.tmpDir.name).load('name', silent=True)
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.api = None
+    cls.tmpDir.cleanup()
+
+  def texts(self):
+    T = self.api.T
+    maxSlot = F.otype.maxSlot
+    allNodes = range(1, F.otype.maxNode + 1)
+    mixed = (2, 1, maxSlot + 1, 3)
+    texts = []
+    for fmt in (None, 'text-orig-full', 'text-orig-plain', 'no-such-format'):
+      for descend in (False, True):
+        texts.append([T.text(n, fmt=fmt, descend=descend) for n in allNodes])
+        texts.append(T.textMany(allNodes, fmt=fmt, descend=descend))
+        texts.append(T.textMany(iter(allNodes), fmt=fmt, descend=descend))
+      for nodes in (range(1, maxSlot + 1), mixed, (-1, 1)):
+        texts.append(T.text(list(nodes), fmt=fmt))
+        texts.append(T.text(iter(nodes), fmt=fmt))
+    return texts
+
+  def test_cached(self):
+    T = self.api.T
+    texts = self.texts()
+    self.assertEqual(texts[0][0:2], ['a-', 'b-'])
+    T.cacheText()
+    self.assertEqual(set(T._slotTexts), {'text-orig-full', 'text-orig-plain'})
+    self.assertEqual(self.texts(), texts)
+
+  def test_explicitFormat(self):
+    # with an explicit format, slots must come from the cache, not from the format itself
+    T = self.api.T
+    T.cacheText()
+    slots = range(1, F.otype.maxSlot + 1)
+    xformats = T._xformats
+    rendered = []
+
+    def recording(repf):
+      return lambda n: rendered.append(n) or repf(n)
+
+    try:
+      T._xformats = {fmt: recording(repf) for (fmt, repf) in xformats.items()}
+      for fmt in ('text-orig-full', 'text-orig-plain'):
+        expected = [xformats[fmt](s) for s in slots]
+        self.assertEqual([T.text(s, fmt=fmt) for s in slots], expected)
+        self.assertEqual(T.textMany(slots, fmt=fmt), expected)
+        self.assertEqual(T.text(list(slots), fmt=fmt), ''.join(expected))
+      self.assertEqual(rendered, [])
+    finally:
+      T._xformats = xformats
+
+
+class parallelManifest(unittest.TestCase):
+
+  def test_compiledOnce(self):
+    # with a manifest that knows of no binaries yet, what the workers did is not done again
+    compiled = []
+    (readTf, compute) = (Data._readTf, Data._compute)
+
+    def countingReadTf(fObj, metaOnly=False):
+      if not metaOnly:
+        compiled.append(fObj.fileName)
+      return readTf(fObj, metaOnly=metaOnly)
+
+    def countingCompute(fObj, metaOnly=False, silent=False):
+      compiled.append(fObj.fileName)
+      return compute(fObj, metaOnly=metaOnly, silent=silent)
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+      for fName in ('otype', 'oslots', 'name', 'link', 'distance', 'role'):
+        shutil.copy(os.path.join('tf', f'{fName}.tf'), tmpDir)
+      Fabric(tmpDir, manifest=True).load('name', silent=True)
+      for path in glob.glob(os.path.join(tmpDir, '.tf', '__*__.tfx')):
+        os.unlink(path)
+      self.assertTrue(writeManifest(tmpDir))
+      try:
+        Data._readTf = countingReadTf
+        Data._compute = countingCompute
+        TFtmp = Fabric(tmpDir, manifest=True)
+        apiTmp = TFtmp.load('name link distance role', silent=True, workers=2)
+      finally:
+        (Data._readTf, Data._compute) = (readTf, compute)
+      self.assertIsNotNone(apiTmp)
+      self.assertEqual(compiled, [])
+      actions = {record['feature']: record['action'] for record in TFtmp.loadProfile()}
+      self.assertEqual({actions[fName] for fName in ('link', 'distance', 'role')}, {'T'})
+      self.assertEqual(actions['__levUp__'], 'C')
+      self.assertEqual(actions['name'], 'B')
+      self.assertEqual(list(apiTmp.E.link.f(1)), [2])
+      del apiTmp
+      del TFtmp
+
+
+if __name__ == '__main__':
+  unittest.main()
+  sys.exit()
@@ -0,0 +1,27 @@
+@edge
+@edgeValues
+@name=testset
+@valueType=int
+@writtenBy=Text-Fabric
+@dateWritten=2026-10-18T20:28:48Z
+
+2	1
+1	3	2
+3	1
+2	4	2
+4	1
+3	5	2
+5	1
+4	6	2
+6	1
+5	7	2
+7	1
+6	8	2
+8	1
+7	9	2
+9	1
+8	10	2
+10	1
+89	3,6,9	0
+89	1,4,7,10	1
+89	2,5,8	2
@@ -0,0 +1,35 @@
+@edge
+@name=testset
+@valueType=str
+@writtenBy=Text-Fabric
+@dateWritten=2026-10-18T20:28:48Z
+
+2
+3
+4
+5
+6
+7
+8
+9
+10
+11	1
+2
+3
+4
+5
+6
+7
+8
+9
+10
+11
+12
+13
+14
+15
+16
+17
+18
+19
+20
@@ -0,0 +1,28 @@
+@edge
+@edgeValues
+@name=testset
+@valueType=str
+@writtenBy=Text-Fabric
+@dateWritten=2026-10-18T20:28:48Z
+
+2	next
+3	next
+4	next
+5	next
+6	next
+7	next
+8	next
+9	next
+10	next
+11	1	sign
+2	sign
+3	sign
+4	sign
+5	sign
+6	sign
+7	sign
+8	sign
+9	sign
+10	sign
+89	53-54	alternate
+89	51-52	half
@@ -533,6 +533,13 @@ def getResultsX(api, results, features, noDescendTypes, fmt=None):
     if nType not in sectionTypes:
       header.append(f'TEXT{i}')
     header.extend(f'{feature}{i}' for feature in featureDict.get(j, emptyA))
+  # fetch the types and feature values column by column
+  nodeColumns = [[r[j] for r in results] for j in range(nTuple)]
+  typeColumns = [F.otype.vMany(nodes) for nodes in nodeColumns]
+  valueColumns = [
+      [Fs(feature).vMany(nodes) for feature in featureDict.get(j, emptyA)]
+      for (j, nodes) in enumerate(nodeColumns)
+  ]
   rows = [tuple(header)]
   for (rm, r) in enumerate(results):
     rn = rm + 1
@@ -544,12 +551,12 @@ def getResultsX(api, results, features, noDescendTypes, fmt=None):
     row.extend(section)
     for j in range(nTuple):
       n = r[j]
-      nType = F.otype.v(n)
+      nType = typeColumns[j][rm]
       row.extend((n, nType))
       if nType not in sectionTypes:
         text = T.text(n, fmt=fmt, descend=nType not in noDescendTypes)
         row.append(text)
-      row.extend(Fs(feature).v(n) for feature in featureDict.get(j, emptyA))
+      row.extend(values[rm] for values in valueColumns[j])
     rows.append(tuple(row))
   return tuple(rows)
 
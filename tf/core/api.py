@@ -1,6 +1,11 @@
 import collections
+import time
+from array import array
+from zlib import crc32
 from .helpers import makeInverse, makeInverseVal, flattenToSet, console
+from .columns import IntColumn, CodedColumn, EdgeColumn, INT_NONE, valueIndex
 from .locality import Locality
+from .nodes import NodeSet
 from .text import Text
 from ..search.search import Search
 
@@ -38,6 +43,7 @@ API_REFS = dict(
     ignored=('Fabric', 'ignored', 'loading'),
     indent=('Misc', 'indent', 'messaging'),
     info=('Misc', 'info', 'messaging'),
+    nodeSet=('Nodes', 'nodeset', 'navigating-nodes'),
     loadLog=('Fabric', 'loadlog', 'loading'),
     otypeRank=('Nodes', 'rank', 'navigating-nodes'),
     reset=('Misc', 'reset', 'messaging'),
@@ -66,6 +72,17 @@ class OtypeFeature(object):
       return self.data[m - 1]
     return None
 
+  def vMany(self, nodes):
+    nodes = _asSequence(nodes)
+    if len(nodes) and min(nodes) < 1:
+      # negative nodes would count from the end of the index
+      return list(map(self.v, nodes))
+    (types, index) = self.typeIndex()
+    try:
+      return list(map(types.__getitem__, map(index.__getitem__, nodes)))
+    except IndexError:
+      return list(map(self.v, nodes))
+
   def s(self, val):
     # NB: the support attribute has been added by precomputing __levels__
     if val in self.support:
@@ -81,6 +98,18 @@ class OtypeFeature(object):
     else:
       return ()
 
+  def typeIndex(self):
+    # the types, with None first, and for every node the position of its type in them
+    if getattr(self, '_typeIndex', None) is None:
+      types = (None, ) + tuple(self.support)
+      index = array('H', [0]) * (self.maxNode + 1)
+      for (i, nType) in enumerate(types):
+        if i:
+          (b, e) = self.support[nType]
+          index[b:e + 1] = array('H', [i]) * (e + 1 - b)
+      self._typeIndex = (types, index)
+    return self._typeIndex
+
 
 class OslotsFeature(object):
 
@@ -100,37 +129,84 @@ class OslotsFeature(object):
     return ()
 
 
+def _asSequence(nodes):
+  return nodes if isinstance(nodes, (list, tuple, range, array)) else list(nodes)
+
+
+def _sortedFreqs(fql):
+  return tuple(sorted(fql.items(), key=lambda x: (-x[1], x[0])))
+
+
 class NodeFeature(object):
 
-  def __init__(self, api, data):
+  def __init__(self, api, data, makeIndex=None):
     self.api = api
     self.data = data
+    self._makeIndex = makeIndex
+    self._index = None
+    self._freqs = None
+    self._freqLists = {}
 
   def v(self, n):
-    if n in self.data:
-      return self.data[n]
-    return None
+    return self.data.get(n, None)
+
+  def vMany(self, nodes):
+    nodes = _asSequence(nodes)
+    getMany = getattr(self.data, 'getMany', None)
+    if getMany is not None:
+      return getMany(nodes)
+    return list(map(self.data.get, nodes))
 
   def s(self, val):
-    Crank = self.api.C.rank.data
-    return tuple(
-        sorted(
-            [n for n in self.data if self.data[n] == val],
-            key=lambda n: Crank[n - 1],
-        )
-    )
+    return self.valueIndex().get(val, ())
+
+  def valueIndex(self):
+    # the nodes per value, in canonical order
+    if self._index is None:
+      index = None if self._makeIndex is None else self._makeIndex()
+      if index is None:
+        C = self.api.C
+        index = valueIndex(self.data, C.order.data, crc32(C.rank.data), None)
+      self._index = index
+    return self._index
 
   def freqList(self, nodeTypes=None):
-    fql = collections.Counter()
-    if nodeTypes is None:
-      for n in self.data:
-        fql[self.data[n]] += 1
-    else:
-      otype = self.api.F.otype.v
-      for n in self.data:
-        if otype(n) in nodeTypes:
-          fql[self.data[n]] += 1
-    return tuple(sorted(fql.items(), key=lambda x: (-x[1], x[0])))
+    key = None if nodeTypes is None else frozenset(nodeTypes)
+    freqLists = self._freqLists
+    if key not in freqLists:
+      fql = collections.Counter()
+      for (nType, freqs) in self._typeFreqs().items():
+        if key is None or nType in key:
+          fql.update(freqs)
+      freqLists[key] = _sortedFreqs(fql)
+    return freqLists[key]
+
+  def _typeFreqs(self):
+    # the frequencies of the values per node type, computed once
+    if self._freqs is None:
+      data = self.data
+      tp = type(data)
+      otype = self.api.F.otype
+      freqs = {}
+      if tp is IntColumn or tp is CodedColumn:
+        # count the slices of the column that hold the nodes of each type
+        (column, ignore) = (data.column, INT_NONE) if tp is IntColumn else (data.codes, 0)
+        for nType in otype.all:
+          (b, e) = otype.sInterval(nType)
+          fql = collections.Counter(column[b:e + 1])
+          fql.pop(ignore, None)
+          if tp is CodedColumn:
+            table = data.table
+            fql = collections.Counter({table[c]: k for (c, k) in fql.items()})
+          freqs[nType] = fql
+      else:
+        (types, index) = otype.typeIndex()
+        for ((t, v), k) in collections.Counter(
+            (index[n], v) for (n, v) in data.items()
+        ).items():
+          freqs.setdefault(types[t], collections.Counter())[v] = k
+      self._freqs = freqs
+    return self._freqs
 
 
 class EdgeFeature(object):
@@ -141,71 +217,114 @@ class EdgeFeature(object):
     if type(data) is tuple:
       self.data = data[0]
       self.dataInv = data[1]
+    elif type(data) is EdgeColumn:
+      self.data = data
+      self.dataInv = data.inverse
     else:
       self.data = data
       self.dataInv = makeInverseVal(self.data) if doValues else makeInverse(self.data)
+    self._freqs = None
+    self._freqLists = {}
 
   def f(self, n):
-    Crank = self.api.C.rank.data
-    if n in self.data:
-      if self.doValues:
-        return tuple(sorted(
-            self.data[n].items(),
-            key=lambda mv: Crank[mv[0] - 1],
-        ))
-      else:
-        return tuple(sorted(
-            self.data[n],
-            key=lambda m: Crank[m - 1],
-        ))
-    return ()
+    data = self.data
+    if type(data) is EdgeColumn and data.order is not None:
+      return data.row(n)
+    return self._sortedRow(data, n)
 
   def t(self, n):
+    data = self.dataInv
+    if type(data) is EdgeColumn and data.order is not None:
+      return data.row(n)
+    return self._sortedRow(data, n)
+
+  def fMany(self, nodes):
+    data = self.data
+    if type(data) is EdgeColumn and data.order is not None:
+      return list(map(data.row, _asSequence(nodes)))
+    return list(map(self.f, _asSequence(nodes)))
+
+  def tMany(self, nodes):
+    data = self.dataInv
+    if type(data) is EdgeColumn and data.order is not None:
+      return list(map(data.row, _asSequence(nodes)))
+    return list(map(self.t, _asSequence(nodes)))
+
+  def _sortedRow(self, data, n):
     Crank = self.api.C.rank.data
-    if n in self.dataInv:
-      if self.doValues:
-        return tuple(sorted(
-            self.dataInv[n].items(),
-            key=lambda mv: Crank[mv[0] - 1],
-        ))
-      else:
-        return tuple(sorted(
-            self.dataInv[n],
-            key=lambda m: Crank[m - 1],
-        ))
-    return ()
+    if type(data) is EdgeColumn:
+      row = data.row(n)
+    elif n in data:
+      row = data[n].items() if self.doValues else data[n]
+    else:
+      return ()
+    if self.doValues:
+      return tuple(sorted(row, key=lambda mv: Crank[mv[0] - 1]))
+    return tuple(sorted(row, key=lambda m: Crank[m - 1]))
 
   def freqList(self, nodeTypesFrom=None, nodeTypesTo=None):
-    if nodeTypesFrom is None and nodeTypesTo is None:
-      if self.doValues:
-        fql = collections.Counter()
-        for (n, vals) in self.data.items():
-          for val in vals.values():
-            fql[val] += 1
-        return tuple(sorted(fql.items(), key=lambda x: (-x[1], x[0])))
+    key = (
+        None if nodeTypesFrom is None else frozenset(nodeTypesFrom),
+        None if nodeTypesTo is None else frozenset(nodeTypesTo),
+    )
+    freqLists = self._freqLists
+    if key not in freqLists:
+      (keyFrom, keyTo) = key
+      fql = collections.Counter() if self.doValues else 0
+      for ((nTypeFrom, nTypeTo), freqs) in self._typeFreqs().items():
+        if (keyFrom is None or nTypeFrom in keyFrom) and (keyTo is None or nTypeTo in keyTo):
+          if self.doValues:
+            fql.update(freqs)
+          else:
+            fql += freqs
+      freqLists[key] = _sortedFreqs(fql) if self.doValues else fql
+    return freqLists[key]
+
+  def _typeFreqs(self):
+    # the frequencies of the values (or the numbers of edges)
+    # per pair of node types of the edges, computed once
+    if self._freqs is None:
+      data = self.data
+      (types, index) = self.api.F.otype.typeIndex()
+      typeOf = index.__getitem__
+      if type(data) is EdgeColumn:
+        # the rows of the nodes of each type form a slice of the targets
+        otype = self.api.F.otype
+        offsets = data.offsets
+        last = len(offsets) - 1
+        counts = collections.Counter()
+        for nType in otype.all:
+          t = types.index(nType)
+          (b, e) = otype.sInterval(nType)
+          (b, e) = (offsets[min(b, last)], offsets[min(e + 1, last)])
+          targetTypes = map(typeOf, data.targets[b:e])
+          if self.doValues:
+            counts.update((t, tt, c) for (tt, c) in zip(targetTypes, data.codes[b:e]))
+          else:
+            counts.update((t, tt) for tt in targetTypes)
+        if self.doValues:
+          table = data.table
+          codeCounts = counts
+          counts = collections.Counter()
+          for ((t, tt, c), k) in codeCounts.items():
+            counts[(t, tt, table[c])] += k
+      elif self.doValues:
+        counts = collections.Counter(
+            (typeOf(n), typeOf(m), v) for (n, vals) in data.items() for (m, v) in vals.items()
+        )
       else:
-        fql = 0
-        for (n, ms) in self.data.items():
-          fql += len(ms)
-        return fql
-    else:
-      otype = self.api.F.otype.v
+        counts = collections.Counter(
+            (typeOf(n), typeOf(m)) for (n, ms) in data.items() for m in ms
+        )
+      freqs = {}
       if self.doValues:
-        fql = collections.Counter()
-        for (n, vals) in self.data.items():
-          if nodeTypesFrom is None or otype(n) in nodeTypesFrom:
-            for (m, val) in vals.items():
-              if nodeTypesTo is None or otype(m) in nodeTypesTo:
-                fql[val] += 1
-        return tuple(sorted(fql.items(), key=lambda x: (-x[1], x[0])))
+        for ((t, tt, v), k) in counts.items():
+          freqs.setdefault((types[t], types[tt]), collections.Counter())[v] = k
       else:
-        fql = 0
-        for (n, ms) in self.data.items():
-          if nodeTypesFrom is None or otype(n) in nodeTypesFrom:
-            for m in ms:
-              if nodeTypesTo is None or otype(m) in nodeTypesTo:
-                fql += len(ms)
-        return fql
+        for ((t, tt), k) in counts.items():
+          freqs[(types[t], types[tt])] = k
+      self._freqs = freqs
+    return self._freqs
 
 
 class Computed(object):
@@ -223,6 +342,70 @@ class EdgeFeatures(object):
   pass
 
 
+class LazyFeatures(object):
+  # a namespace for node or edge features that loads features on first access
+
+  def __init__(self, api, isEdge):
+    self._api = api
+    self._isEdge = isEdge
+
+  def __getattr__(self, fName):
+    # only called for names that are not (yet) in the namespace
+    if fName.startswith('_'):
+      raise AttributeError(fName)
+    feature = self._api.TF._loadLazy(self._api, fName, self._isEdge)
+    if feature is None:
+      raise AttributeError(fName)
+    setattr(self, fName, feature)
+    return feature
+
+
+class ExpiringFeatures(LazyFeatures):
+  # a lazy namespace that unloads features that have not been accessed for a while
+
+  def __init__(self, api, isEdge, expire):
+    super().__init__(api, isEdge)
+    self._expire = expire
+    self._accessed = {}
+    self._swept = time.time()
+
+  def __getattribute__(self, name):
+    if name[0] != '_':
+      now = time.time()
+      object.__getattribute__(self, '_accessed')[name] = now
+      if now - object.__getattribute__(self, '_swept') > object.__getattribute__(self, '_expire'):
+        object.__getattribute__(self, '_sweep')(now)
+    return object.__getattribute__(self, name)
+
+  def _sweep(self, now):
+    self._swept = now
+    expire = self._expire
+    TF = self._api.TF
+    for (fName, accessed) in list(self._accessed.items()):
+      if now - accessed > expire:
+        del self._accessed[fName]
+        if fName in self.__dict__ and TF._unloadLazy(fName):
+          delattr(self, fName)
+
+
+class ResidentFeatures(LazyFeatures):
+  # a lazy namespace whose features are kept under a memory budget by a Residency
+
+  def __init__(self, api, isEdge, residency):
+    super().__init__(api, isEdge)
+    self._residency = residency
+
+  def __getattribute__(self, name):
+    if name[0] != '_':
+      object.__getattribute__(self, '_residency').use(name)
+    return object.__getattribute__(self, name)
+
+  def __setattr__(self, name, value):
+    object.__setattr__(self, name, value)
+    if name[0] != '_':
+      self._residency.admit(self, name, value)
+
+
 class Computeds(object):
   pass
 
@@ -232,9 +415,20 @@ class Api(object):
   def __init__(self, TF):
     self.TF = TF
     self.ignored = tuple(sorted(TF.featuresIgnored))
-    self.F = NodeFeatures()
+    if TF.residency is not None:
+      self.F = ResidentFeatures(self, False, TF.residency)
+      self.E = ResidentFeatures(self, True, TF.residency)
+    elif TF.lazy:
+      if TF.expire:
+        self.F = ExpiringFeatures(self, False, TF.expire)
+        self.E = ExpiringFeatures(self, True, TF.expire)
+      else:
+        self.F = LazyFeatures(self, False)
+        self.E = LazyFeatures(self, True)
+    else:
+      self.F = NodeFeatures()
+      self.E = EdgeFeatures()
     self.Feature = self.F
-    self.E = EdgeFeatures()
     self.Edge = self.E
     self.C = Computeds()
     self.Computed = self.C
@@ -275,14 +469,19 @@ class Api(object):
       yield n
 
   def sortNodes(self, nodeSet):
+    if type(nodeSet) is NodeSet:
+      return list(nodeSet)
     Crank = self.C.rank.data
     return sorted(nodeSet, key=lambda n: Crank[n - 1])
 
+  def nodeSet(self, nodes=()):
+    return NodeSet(self, nodes)
+
   def Fall(self):
-    return sorted(x[0] for x in self.F.__dict__.items())
+    return sorted(x[0] for x in self.F.__dict__.items() if not x[0].startswith('_'))
 
   def Eall(self):
-    return sorted(x[0] for x in self.E.__dict__.items())
+    return sorted(x[0] for x in self.E.__dict__.items() if not x[0].startswith('_'))
 
   def Call(self):
     return sorted(x[0] for x in self.C.__dict__.items())
@@ -0,0 +1,153 @@
+import os
+import mmap
+import struct
+import pickle
+from multiprocessing import shared_memory, resource_tracker
+
+from ..parameters import PICKLE_PROTOCOL
+from .columns import (
+    writeColumns, readColumns, columnsFromBuffer, columnFromSections,
+    nodeColumnSections, edgeColumnSections, sequenceSections, sequenceFromSections,
+)
+
+# BUNDLES
+#
+# A bundle is a single column file (see columns.py) that holds a whole dataset:
+# the compiled features, the precomputed data and the metadata.
+# The header has an entry per feature with its metadata and the way its data is stored:
+#
+#   column    the sections of a node or edge column, named feature/section
+#   sequence  the sections of warp or precomputed data, see sequenceSections()
+#   pickle    a single section feature/pickle with the pickled data
+#
+# Features without data (config features) only have metadata.
+# The file is memory mapped: a feature is only touched when it is loaded.
+#
+# A bundle can also be copied into a shared memory segment, by one process,
+# after which other processes can attach to it by name.
+# The data of all features that are not pickled is then read from the segment itself,
+# so that those processes together hold only one copy of it.
+
+KIND_BUNDLE = 'bundle'
+
+
+class Bundle(object):
+
+  def __init__(self, path, shared=False):
+    # path is the name of a shared memory segment if shared is True
+    self.path = path
+    self.shared = shared
+    if shared:
+      columns = columnsFromBuffer(attachShared(path))
+    else:
+      columns = readColumns(path)
+    if columns is None or columns[0]['kind'] != KIND_BUNDLE:
+      self.good = False
+      self.features = {}
+      self.sections = {}
+    else:
+      self.good = True
+      self.features = columns[0]['features']
+      self.sections = columns[1]
+
+  def attach(self, fObj, fName):
+    entry = self.features.get(fName, None)
+    if entry is None:
+      return False
+    fObj.bundle = self
+    fObj.knownModified = (None, None)
+    if not fObj.method:
+      fObj.metaData = entry['metaData']
+      fObj.isEdge = entry['isEdge']
+      fObj.isConfig = entry['isConfig']
+      fObj.edgeValues = entry['edgeValues']
+      fObj.dataType = entry['dataType']
+    return True
+
+  def size(self, fName):
+    prefix = f'{fName}/'
+    return sum(
+        section.nbytes for (name, section) in self.sections.items() if name.startswith(prefix)
+    )
+
+  def read(self, fName):
+    entry = self.features[fName]
+    if 'pickle' in entry:
+      return pickle.loads(self.sections[f'{fName}/pickle'])
+    if 'column' in entry or 'sequence' in entry:
+      prefix = f'{fName}/'
+      sections = {
+          name[len(prefix):]: section
+          for (name, section) in self.sections.items()
+          if name.startswith(prefix)
+      }
+      if 'column' in entry:
+        return columnFromSections(entry['column'], sections)
+      return sequenceFromSections(entry['sequence'], sections)
+    return None
+
+
+def writeBundle(path, features):
+  sections = []
+  entries = {}
+  for (fName, fObj) in sorted(features.items()):
+    entry = dict(
+        metaData=fObj.metaData,
+        isEdge=fObj.isEdge,
+        isConfig=fObj.isConfig,
+        edgeValues=fObj.edgeValues,
+        dataType=fObj.dataType,
+    )
+    entries[fName] = entry
+    if fObj.isConfig or not fObj.dataLoaded:
+      continue
+    column = None
+    if fObj.isColumnar():
+      try:
+        column = (
+            edgeColumnSections(fObj.data, fObj.dataType, fObj.edgeValues)
+            if fObj.isEdge else
+            nodeColumnSections(fObj.data, fObj.dataType)
+        )
+      except (struct.error, OverflowError):
+        # values that do not fit in a column: fall back on pickle
+        pass
+    sequence = sequenceSections(fObj.data) if column is None else None
+    if column is not None:
+      (kind, columnSections, info) = column
+      entry['column'] = dict(kind=kind, **info)
+      sections.extend((f'{fName}/{name}', section) for (name, section) in columnSections)
+    elif sequence is not None:
+      (entry['sequence'], sequenceParts) = sequence
+      sections.extend((f'{fName}/{name}', section) for (name, section) in sequenceParts)
+    else:
+      entry['pickle'] = True
+      sections.append((f'{fName}/pickle', pickle.dumps(fObj.data, protocol=PICKLE_PROTOCOL)))
+  writeColumns(path, KIND_BUNDLE, sections, features=entries)
+
+
+def shareBundle(path, name=None):
+  # copy a bundle file into a new shared memory segment;
+  # the caller owns the segment: keep it while others use it, then close() and unlink() it
+  size = os.path.getsize(path)
+  segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+  with open(path, 'rb') as fh:
+    fh.readinto(segment.buf[0:size])
+  return segment
+
+
+def attachShared(name):
+  # a read-only view on a shared memory segment made by shareBundle()
+  try:
+    segment = shared_memory.SharedMemory(name=name, track=False)
+  except TypeError:
+    # before python 3.13 every process that attaches would remove the segment on exit
+    segment = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(segment._name, 'shared_memory')
+  # map the segment ourselves: the segment object cannot be closed while views on it exist
+  if os.name == 'nt':
+    mm = mmap.mmap(-1, segment.size, tagname=name, access=mmap.ACCESS_READ)
+  else:
+    mm = mmap.mmap(segment._fd, segment.size, access=mmap.ACCESS_READ)
+  segment.close()
+  return memoryview(mm)
@@ -0,0 +1,845 @@
+import os
+import sys
+import mmap
+import json
+import struct
+import collections.abc
+from array import array
+
+# COLUMNAR BINARY FORMAT
+#
+# A column file consists of
+#
+#   magic        8 bytes
+#   header size  4 bytes, little endian
+#   header       json: byteorder, kind, dataType and a table of sections
+#   sections     raw arrays, each aligned at 8 bytes relative to the data start
+#
+# The file is opened with mmap, and every section is exposed as a memoryview
+# cast to the typecode of the section, so no data is copied when it is loaded.
+# Processes that open the same file share the pages of the OS file cache.
+
+COLUMN_MAGIC = b'TFCOL\x00\x00\x01'
+COLUMN_HEADER = struct.Struct('<I')
+COLUMN_ALIGN = 8
+
+KIND_NODE_HEAP = 'nodeHeap'
+KIND_NODE_INT = 'nodeInt'
+KIND_NODE_CODES = 'nodeCodes'
+KIND_EDGE = 'edge'
+KIND_VALUE_INDEX = 'valueIndex'
+
+PRESENT = b'\x01'
+INT_VALUE = struct.Struct('=q')
+INT_NONE = -2**63
+# maps the missing int value to None, see IntColumn.getMany()
+INT_MISSING = {INT_NONE: None}
+DENSE_FACTOR = 10
+
+
+def _aligned(n):
+  return (n + COLUMN_ALIGN - 1) // COLUMN_ALIGN * COLUMN_ALIGN
+
+
+def isColumnFile(path):
+  with open(path, 'rb') as fh:
+    return fh.read(len(COLUMN_MAGIC)) == COLUMN_MAGIC
+
+
+def writeColumns(path, kind, sections, **info):
+  table = {}
+  pos = 0
+  for (name, data) in sections:
+    if type(data) is array:
+      (typecode, count, size) = (data.typecode, len(data), len(data) * data.itemsize)
+    elif type(data) is memoryview:
+      (typecode, count, size) = (data.format, len(data), data.nbytes)
+    else:
+      (typecode, count, size) = ('B', len(data), len(data))
+    table[name] = (pos, typecode, count)
+    pos = _aligned(pos + size)
+  header = json.dumps(
+      dict(byteorder=sys.byteorder, kind=kind, sections=table, **info),
+      ensure_ascii=False,
+  ).encode('utf8')
+  start = _aligned(len(COLUMN_MAGIC) + COLUMN_HEADER.size + len(header))
+
+  tmpPath = f'{path}.tmp'
+  try:
+    with open(tmpPath, 'wb') as fh:
+      fh.write(COLUMN_MAGIC)
+      fh.write(COLUMN_HEADER.pack(len(header)))
+      fh.write(header)
+      for (name, data) in sections:
+        fh.write(b'\x00' * (start + table[name][0] - fh.tell()))
+        fh.write(data)
+    # replacing instead of overwriting leaves files that are mapped by other processes intact
+    os.replace(tmpPath, path)
+  except BaseException:
+    if os.path.exists(tmpPath):
+      try:
+        os.unlink(tmpPath)
+      except OSError:
+        pass
+    raise
+
+
+def readColumns(path):
+  with open(path, 'rb') as fh:
+    mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+  return columnsFromBuffer(memoryview(mm))
+
+
+def columnsFromBuffer(buf):
+  lMagic = len(COLUMN_MAGIC)
+  if bytes(buf[0:lMagic]) != COLUMN_MAGIC:
+    return None
+  (lHeader, ) = COLUMN_HEADER.unpack_from(buf, lMagic)
+  headerStart = lMagic + COLUMN_HEADER.size
+  header = json.loads(bytes(buf[headerStart:headerStart + lHeader]).decode('utf8'))
+  if header['byteorder'] != sys.byteorder:
+    return None
+  start = _aligned(headerStart + lHeader)
+  sections = {}
+  for (name, (pos, typecode, count)) in header['sections'].items():
+    b = start + pos
+    if typecode == 'B':
+      sections[name] = buf[b:b + count]
+    else:
+      itemsize = array(typecode).itemsize
+      sections[name] = buf[b:b + count * itemsize].cast(typecode)
+  return (header, sections)
+
+
+# NODE FEATURE COLUMNS
+#
+# The values of a node feature are stored in a heap, node after node.
+# A node-indexed array of offsets points into that heap:
+# the value of node n occupies heap[offsets[n]:offsets[n + 1]].
+# Nodes without a value occupy nothing.
+# A string value is preceded by a marker byte, so that the empty string
+# can be distinguished from a missing value.
+# An int value occupies a fixed number of bytes.
+
+
+class NodeColumn(collections.abc.Mapping):
+
+  def __init__(self, offsets, heap, dataType, count):
+    self.offsets = offsets
+    self.heap = heap
+    self.dataType = dataType
+    self.count = count
+    self.maxNode = len(offsets) - 2
+    self._decode = self._decodeInt if dataType == 'int' else self._decodeStr
+
+  def _decodeStr(self, b, e):
+    return str(self.heap[b + 1:e], encoding='utf8')
+
+  def _decodeInt(self, b, e):
+    return INT_VALUE.unpack_from(self.heap, b)[0]
+
+  def get(self, n, default=None):
+    if 0 < n <= self.maxNode:
+      offsets = self.offsets
+      b = offsets[n]
+      e = offsets[n + 1]
+      if e > b:
+        return self._decode(b, e)
+    return default
+
+  def __getitem__(self, n):
+    value = self.get(n, self)
+    if value is self:
+      raise KeyError(n)
+    return value
+
+  def __contains__(self, n):
+    return 0 < n <= self.maxNode and self.offsets[n + 1] > self.offsets[n]
+
+  def __iter__(self):
+    offsets = self.offsets
+    b = offsets[1] if self.maxNode > 0 else 0
+    for n in range(1, self.maxNode + 1):
+      e = offsets[n + 1]
+      if e > b:
+        yield n
+      b = e
+
+  def __len__(self):
+    return self.count
+
+  def items(self):
+    offsets = self.offsets
+    decode = self._decode
+    b = offsets[1] if self.maxNode > 0 else 0
+    for n in range(1, self.maxNode + 1):
+      e = offsets[n + 1]
+      if e > b:
+        yield (n, decode(b, e))
+      b = e
+
+  def values(self):
+    return (v for (n, v) in self.items())
+
+  def __reduce__(self):
+    return (dict, (dict(self.items()), ))
+
+
+# DENSE INT COLUMNS
+#
+# The values of an int feature that has values for a sizable fraction of the nodes
+# are stored in a node-indexed array of 64-bit ints.
+# Nodes without a value have the value INT_NONE.
+
+
+class IntColumn(collections.abc.Mapping):
+
+  def __init__(self, column, count=None):
+    self.column = column
+    self.dataType = 'int'
+    self.count = len(column) - column.count(INT_NONE) if count is None else count
+    self.maxNode = len(column) - 1
+
+  def get(self, n, default=None):
+    if 0 < n <= self.maxNode:
+      v = self.column[n]
+      if v != INT_NONE:
+        return v
+    return default
+
+  def getMany(self, nodes):
+    # the values of many nodes (a sequence of node numbers) at once,
+    # None for nodes without a value
+    # negative nodes would count from the end of the column
+    if len(nodes) and min(nodes) < 1:
+      return list(map(self.get, nodes))
+    try:
+      values = list(map(self.column.__getitem__, nodes))
+    except IndexError:
+      return list(map(self.get, nodes))
+    return list(map(INT_MISSING.get, values, values))
+
+  def __getitem__(self, n):
+    if 0 < n <= self.maxNode:
+      v = self.column[n]
+      if v != INT_NONE:
+        return v
+    raise KeyError(n)
+
+  def __contains__(self, n):
+    return 0 < n <= self.maxNode and self.column[n] != INT_NONE
+
+  def __iter__(self):
+    column = self.column
+    return (n for n in range(1, self.maxNode + 1) if column[n] != INT_NONE)
+
+  def __len__(self):
+    return self.count
+
+  def items(self):
+    column = self.column
+    return ((n, column[n]) for n in range(1, self.maxNode + 1) if column[n] != INT_NONE)
+
+  def values(self):
+    return filter(INT_NONE.__ne__, self.column)
+
+  def __reduce__(self):
+    column = self.column
+    if type(column) is not array:
+      column = array('q', column.tobytes())
+    return (IntColumn, (column, self.count))
+
+
+# DICTIONARY ENCODED COLUMNS
+#
+# The values of a string feature with relatively few distinct values
+# are stored in a value table, and every node gets the code of its value,
+# i.e. its index in that table, in a node-indexed array.
+# Code 0 means: no value.
+
+
+class CodedColumn(collections.abc.Mapping):
+
+  def __init__(self, codes, table, count=None):
+    self.codes = codes
+    self.table = table
+    self.dataType = 'str'
+    self.count = len(codes) - codes.count(0) if count is None else count
+    self.maxNode = len(codes) - 1
+    self._codeFromValue = None
+
+  def get(self, n, default=None):
+    if 0 < n <= self.maxNode:
+      c = self.codes[n]
+      if c:
+        return self.table[c]
+    return default
+
+  def getMany(self, nodes):
+    # the values of many nodes (a sequence of node numbers) at once,
+    # None for nodes without a value
+    # negative nodes would count from the end of the codes
+    if len(nodes) and min(nodes) < 1:
+      return list(map(self.get, nodes))
+    try:
+      return list(map(self.table.__getitem__, map(self.codes.__getitem__, nodes)))
+    except IndexError:
+      return list(map(self.get, nodes))
+
+  def __getitem__(self, n):
+    if 0 < n <= self.maxNode:
+      c = self.codes[n]
+      if c:
+        return self.table[c]
+    raise KeyError(n)
+
+  def __contains__(self, n):
+    return 0 < n <= self.maxNode and self.codes[n] != 0
+
+  def __iter__(self):
+    codes = self.codes
+    return (n for n in range(1, self.maxNode + 1) if codes[n])
+
+  def __len__(self):
+    return self.count
+
+  def items(self):
+    codes = self.codes
+    table = self.table
+    return ((n, table[codes[n]]) for n in range(1, self.maxNode + 1) if codes[n])
+
+  def values(self):
+    return map(self.table.__getitem__, filter(None, self.codes))
+
+  def code(self, n):
+    return self.codes[n] if 0 < n <= self.maxNode else 0
+
+  def codesOf(self, values):
+    if self._codeFromValue is None:
+      self._codeFromValue = {v: c for (c, v) in enumerate(self.table) if c}
+    codeFromValue = self._codeFromValue
+    return {codeFromValue[v] for v in values if v in codeFromValue}
+
+  def __reduce__(self):
+    codes = self.codes
+    if type(codes) is not array:
+      codes = array(codes.format, codes.tobytes())
+    return (CodedColumn, (codes, self.table, self.count))
+
+
+# EDGE COLUMNS
+#
+# The targets of an edge feature are stored in compressed sparse rows:
+# a node-indexed array of offsets points into an array of targets:
+# the targets of node n are targets[offsets[n]:offsets[n + 1]], in node order.
+# If the edges carry values, a parallel array holds the codes of those values
+# in a value table, where code 0 means: no value.
+# The inverse edges are stored in the same way, in a second EdgeColumn.
+# Once the canonical order of the nodes is known, the rows can be sorted by rank;
+# order is then a signature of the rank that has been used.
+
+
+class EdgeColumn(collections.abc.Mapping):
+
+  def __init__(self, offsets, targets, codes, table, count, inverse=None, order=None):
+    self.offsets = offsets
+    self.targets = targets
+    self.codes = codes
+    self.table = table
+    self.count = count
+    self.inverse = inverse
+    self.order = order
+    self.doValues = codes is not None
+    self.maxNode = len(offsets) - 2
+
+  def row(self, n):
+    if 0 < n <= self.maxNode:
+      offsets = self.offsets
+      b = offsets[n]
+      e = offsets[n + 1]
+      if e > b:
+        if self.doValues:
+          return tuple(zip(self.targets[b:e], map(self.table.__getitem__, self.codes[b:e])))
+        return tuple(self.targets[b:e])
+    return ()
+
+  def get(self, n, default=None):
+    row = self.row(n)
+    if not row:
+      return default
+    return dict(row) if self.doValues else set(row)
+
+  def __getitem__(self, n):
+    row = self.row(n)
+    if not row:
+      raise KeyError(n)
+    return dict(row) if self.doValues else set(row)
+
+  def __contains__(self, n):
+    return 0 < n <= self.maxNode and self.offsets[n + 1] > self.offsets[n]
+
+  def __iter__(self):
+    offsets = self.offsets
+    return (n for n in range(1, self.maxNode + 1) if offsets[n + 1] > offsets[n])
+
+  def __len__(self):
+    return self.count
+
+  def items(self):
+    return ((n, self[n]) for n in self)
+
+  def values(self):
+    return (self[n] for n in self)
+
+  def rankSorted(self, rank, order):
+    offsets = self.offsets
+    targets = self.targets
+    codes = self.codes
+    newTargets = array('I')
+    newCodes = None if codes is None else array(_typecode(codes))
+    for n in range(1, self.maxNode + 1):
+      b = offsets[n]
+      e = offsets[n + 1]
+      if e - b > 1:
+        ixs = sorted(range(b, e), key=lambda i: rank[targets[i] - 1])
+        newTargets.extend(targets[i] for i in ixs)
+        if codes is not None:
+          newCodes.extend(codes[i] for i in ixs)
+      elif e > b:
+        newTargets.append(targets[b])
+        if codes is not None:
+          newCodes.append(codes[b])
+    return EdgeColumn(
+        _asArray(offsets),
+        newTargets,
+        newCodes,
+        self.table,
+        self.count,
+        None if self.inverse is None else self.inverse.rankSorted(rank, order),
+        order,
+    )
+
+  def __reduce__(self):
+    return (
+        EdgeColumn,
+        (
+            _asArray(self.offsets),
+            _asArray(self.targets),
+            None if self.codes is None else _asArray(self.codes),
+            self.table,
+            self.count,
+            self.inverse,
+            self.order,
+        ),
+    )
+
+
+def _typecode(data):
+  return data.typecode if type(data) is array else data.format
+
+
+def _asArray(data):
+  return data if type(data) is array else array(data.format, data.tobytes())
+
+
+def _edgeRows(rows, maxNode, codeFromValue):
+  offsets = array('Q', [0]) * (maxNode + 2)
+  targets = array('I')
+  codes = None if codeFromValue is None else array('I')
+  for n in range(1, maxNode + 1):
+    offsets[n] = len(targets)
+    row = rows.get(n, None)
+    if row:
+      ms = sorted(row)
+      targets.extend(ms)
+      if codes is not None:
+        codes.extend(codeFromValue[row[m]] for m in ms)
+  offsets[maxNode + 1] = len(targets)
+  if codes is not None and len(codeFromValue) <= 0xffff:
+    codes = array('H', codes)
+  return (offsets, targets, codes)
+
+
+def edgeColumn(data, doValues):
+  if doValues:
+    table = [None]
+    codeFromValue = {None: 0}
+    inverse = {}
+    for (n, row) in data.items():
+      for (m, v) in row.items():
+        if v not in codeFromValue:
+          codeFromValue[v] = len(table)
+          table.append(v)
+        inverse.setdefault(m, {})[n] = v
+    table = tuple(table)
+  else:
+    table = None
+    codeFromValue = None
+    inverse = {}
+    for (n, row) in data.items():
+      for m in row:
+        inverse.setdefault(m, set()).add(n)
+  maxNode = max(max(data, default=0), max(inverse, default=0))
+  inverseColumn = EdgeColumn(*_edgeRows(inverse, maxNode, codeFromValue), table, len(inverse))
+  return EdgeColumn(
+      *_edgeRows(data, maxNode, codeFromValue),
+      table,
+      sum(1 for row in data.values() if row),
+      inverseColumn,
+  )
+
+
+# VALUE INDEXES
+#
+# The nodes of a node feature per value, in canonical order:
+# the nodes with the i-th value are nodes[offsets[i]:offsets[i + 1]].
+# Like an edge column, an index records the rank signature of the canonical order
+# (see EdgeColumn) and the modification time of the binary it has been made from.
+
+
+class ValueIndex(collections.abc.Mapping):
+
+  def __init__(self, values, offsets, nodes, order, source):
+    self.values = values
+    self.offsets = offsets
+    self.nodes = nodes
+    self.order = order
+    self.source = source
+    self._positions = {v: i for (i, v) in enumerate(values)}
+
+  def __getitem__(self, value):
+    i = self._positions[value]
+    return tuple(self.nodes[self.offsets[i]:self.offsets[i + 1]])
+
+  def get(self, value, default=()):
+    i = self._positions.get(value, None)
+    return default if i is None else tuple(self.nodes[self.offsets[i]:self.offsets[i + 1]])
+
+  def count(self, value):
+    i = self._positions.get(value, None)
+    return 0 if i is None else self.offsets[i + 1] - self.offsets[i]
+
+  def __iter__(self):
+    return iter(self.values)
+
+  def __len__(self):
+    return len(self.values)
+
+
+def valueIndex(data, order, signature, source):
+  # order is the canonical order, so the nodes arrive sorted
+  nodesFromValue = {}
+  get = data.get
+  for n in order:
+    v = get(n, None)
+    if v is not None:
+      nodesFromValue.setdefault(v, []).append(n)
+  offsets = array('Q', [0])
+  nodes = array('I')
+  for ns in nodesFromValue.values():
+    nodes.extend(ns)
+    offsets.append(len(nodes))
+  return ValueIndex(tuple(nodesFromValue), offsets, nodes, signature, source)
+
+
+def writeValueIndex(path, index, dataType):
+  sections = [('offsets', index.offsets), ('nodes', index.nodes)]
+  if dataType == 'int':
+    sections.append(('valueInts', array('q', index.values)))
+  else:
+    sections.extend(zip(('valueOffsets', 'valueHeap'), _heapFromValues(index.values)))
+  writeColumns(
+      path, KIND_VALUE_INDEX, sections, dataType=dataType, order=index.order, source=index.source
+  )
+
+
+# ROW COLUMNS
+#
+# A sequence of rows of nodes, such as the embedders of every node,
+# stored as an array of offsets into a single array of nodes:
+# row i is values[offsets[i]:offsets[i + 1]].
+# The rows may be followed by a tail of a few plain values,
+# such as the maxSlot at the end of the oslots data.
+
+
+class RowColumn(collections.abc.Sequence):
+  # for instances that have been pickled before there were tails
+  tail = ()
+
+  def __init__(self, offsets, values, tail=()):
+    self.offsets = offsets
+    self.values = values
+    self.tail = tail
+
+  def __getitem__(self, i):
+    if type(i) is slice:
+      return tuple(self[j] for j in range(*i.indices(len(self))))
+    n = len(self.offsets) - 1
+    if i < 0:
+      i += n + len(self.tail)
+    if not 0 <= i < n:
+      if n <= i < n + len(self.tail):
+        return self.tail[i - n]
+      raise IndexError(i)
+    offsets = self.offsets
+    return tuple(self.values[offsets[i]:offsets[i + 1]])
+
+  def __len__(self):
+    return len(self.offsets) - 1 + len(self.tail)
+
+
+# TABLE COLUMNS
+#
+# A sequence of values from a small table, such as the node types of the otype data,
+# stored as an array of codes into the table, possibly followed by a tail.
+
+
+class TableColumn(collections.abc.Sequence):
+
+  def __init__(self, codes, table, tail=()):
+    self.codes = codes
+    self.table = table
+    self.tail = tail
+
+  def __getitem__(self, i):
+    if type(i) is slice:
+      return tuple(self[j] for j in range(*i.indices(len(self))))
+    n = len(self.codes)
+    if i < 0:
+      i += n + len(self.tail)
+    if not 0 <= i < n:
+      if n <= i < n + len(self.tail):
+        return self.tail[i - n]
+      raise IndexError(i)
+    return self.table[self.codes[i]]
+
+  def __len__(self):
+    return len(self.codes) + len(self.tail)
+
+
+# SEQUENCES
+#
+# Warp and precomputed data that consist of arrays, rows of nodes or values from a
+# small table can also be stored as sections, so that they can be mapped instead of
+# unpickled. The layout is described by a json spec:
+#
+#   {"array": name}                                  an array of numbers
+#   {"rows": [offsets, values], "tail": [...]}      a RowColumn
+#   {"table": codes, "values": [...], "tail": [...]}  a TableColumn
+#   {"parts": [spec, ...]}                           a tuple of the above
+
+SEQUENCE_TAIL = 2
+
+
+def sequenceSections(data, name='s'):
+  # the spec and the sections of data, or None if data does not have one of these shapes
+  if type(data) is array or type(data) is memoryview:
+    return (dict(array=name), [(name, data)])
+  if type(data) is RowColumn:
+    return (
+        dict(rows=[f'{name}.offsets', f'{name}.values'], tail=list(data.tail)),
+        [(f'{name}.offsets', data.offsets), (f'{name}.values', data.values)],
+    )
+  if type(data) is TableColumn:
+    return (
+        dict(table=f'{name}.codes', values=list(data.table), tail=list(data.tail)),
+        [(f'{name}.codes', data.codes)],
+    )
+  if type(data) is not tuple or not data:
+    return None
+  if all(type(part) is tuple for part in data) and len(data) <= SEQUENCE_TAIL:
+    parts = [sequenceSections(part, name=f'{name}.{i}') for (i, part) in enumerate(data)]
+    if None in parts:
+      return None
+    return (
+        dict(parts=[part[0] for part in parts]),
+        [section for part in parts for section in part[1]],
+    )
+  nHead = len(data)
+  while nHead and len(data) - nHead < SEQUENCE_TAIL and type(data[nHead - 1]) in {int, str}:
+    nHead -= 1
+  (head, tail) = (data[0:nHead], list(data[nHead:]))
+  if any(type(x) not in {int, str} for x in tail):
+    return None
+  try:
+    if all(type(row) is tuple for row in head):
+      offsets = array('Q', [0])
+      values = array('I')
+      for row in head:
+        values.extend(row)
+        offsets.append(len(values))
+      return sequenceSections(RowColumn(offsets, values, tail), name=name)
+    if all(type(value) is str for value in head):
+      codeFromValue = {}
+      for value in head:
+        codeFromValue.setdefault(value, len(codeFromValue))
+      codes = array('H' if len(codeFromValue) <= 0xffff else 'I', (codeFromValue[v] for v in head))
+      return sequenceSections(TableColumn(codes, tuple(codeFromValue), tail), name=name)
+  except (TypeError, OverflowError):
+    pass
+  return None
+
+
+def sequenceFromSections(spec, sections):
+  if 'array' in spec:
+    return sections[spec['array']]
+  if 'rows' in spec:
+    (offsets, values) = spec['rows']
+    return RowColumn(sections[offsets], sections[values], tuple(spec['tail']))
+  if 'table' in spec:
+    return TableColumn(sections[spec['table']], tuple(spec['values']), tuple(spec['tail']))
+  return tuple(sequenceFromSections(part, sections) for part in spec['parts'])
+
+
+def compactNodeData(data, dataType):
+  if dataType == 'str' and data:
+    maxNode = max(data)
+    if len(data) * DENSE_FACTOR >= maxNode:
+      table = [None]
+      codeFromValue = {}
+      for v in data.values():
+        if v not in codeFromValue:
+          codeFromValue[v] = len(table)
+          table.append(v)
+      if len(table) * 2 <= len(data):
+        codes = array('H' if len(table) <= 0xffff else 'I', [0]) * (maxNode + 1)
+        for (n, v) in data.items():
+          codes[n] = codeFromValue[v]
+        return CodedColumn(codes, tuple(table), len(data))
+  if dataType == 'int' and data:
+    maxNode = max(data)
+    if len(data) * DENSE_FACTOR >= maxNode:
+      column = array('q', [INT_NONE]) * (maxNode + 1)
+      try:
+        for (n, v) in data.items():
+          column[n] = v
+      except OverflowError:
+        return data
+      if column.count(INT_NONE) == maxNode + 1 - len(data):
+        return IntColumn(column, len(data))
+  return data
+
+
+def writeNodeColumn(path, data, dataType):
+  (kind, sections, info) = nodeColumnSections(data, dataType)
+  writeColumns(path, kind, sections, **info)
+
+
+def writeEdgeColumn(path, data, dataType, doValues):
+  (kind, sections, info) = edgeColumnSections(data, dataType, doValues)
+  writeColumns(path, kind, sections, **info)
+
+
+def nodeColumnSections(data, dataType):
+  if type(data) is IntColumn:
+    return (KIND_NODE_INT, (('values', data.column), ), dict(count=data.count))
+  if type(data) is CodedColumn:
+    (valueOffsets, valueHeap) = _heapFromValues(data.table[1:])
+    return (
+        KIND_NODE_CODES,
+        (('codes', data.codes), ('valueOffsets', valueOffsets), ('valueHeap', valueHeap)),
+        dict(count=data.count),
+    )
+  if type(data) is NodeColumn:
+    return (
+        KIND_NODE_HEAP,
+        (('offsets', data.offsets), ('heap', data.heap)),
+        dict(dataType=data.dataType, count=data.count),
+    )
+  maxNode = max(data) if data else 0
+  offsets = array('Q', [0]) * (maxNode + 2)
+  heap = bytearray()
+  isInt = dataType == 'int'
+  for n in range(1, maxNode + 1):
+    offsets[n] = len(heap)
+    if n in data:
+      value = data[n]
+      heap.extend(INT_VALUE.pack(value) if isInt else PRESENT + value.encode('utf8'))
+  offsets[maxNode + 1] = len(heap)
+  return (
+      KIND_NODE_HEAP,
+      (('offsets', offsets), ('heap', heap)),
+      dict(dataType=dataType, count=len(data)),
+  )
+
+
+def edgeColumnSections(data, dataType, doValues):
+  if type(data) is not EdgeColumn:
+    data = edgeColumn(data, doValues)
+  inverse = data.inverse
+  sections = [
+      ('offsets', data.offsets),
+      ('targets', data.targets),
+      ('invOffsets', inverse.offsets),
+      ('invTargets', inverse.targets),
+  ]
+  if data.doValues:
+    sections.extend((('codes', data.codes), ('invCodes', inverse.codes)))
+    if dataType == 'int':
+      sections.append(('valueInts', array('q', data.table[1:])))
+    else:
+      sections.extend(zip(('valueOffsets', 'valueHeap'), _heapFromValues(data.table[1:])))
+  return (
+      KIND_EDGE,
+      sections,
+      dict(
+          dataType=dataType,
+          doValues=data.doValues,
+          count=data.count,
+          invCount=inverse.count,
+          order=data.order,
+      ),
+  )
+
+
+def _heapFromValues(values):
+  offsets = array('Q', [0])
+  heap = bytearray()
+  for v in values:
+    heap.extend(v.encode('utf8'))
+    offsets.append(len(heap))
+  return (offsets, heap)
+
+
+def _valuesFromHeap(offsets, heap):
+  return tuple(
+      str(heap[offsets[i]:offsets[i + 1]], encoding='utf8') for i in range(len(offsets) - 1)
+  )
+
+
+def columnFromSections(header, sections):
+  kind = header['kind']
+  if kind == KIND_NODE_HEAP:
+    return NodeColumn(sections['offsets'], sections['heap'], header['dataType'], header['count'])
+  if kind == KIND_NODE_INT:
+    return IntColumn(sections['values'], header['count'])
+  if kind == KIND_NODE_CODES:
+    table = (None, ) + _valuesFromHeap(sections['valueOffsets'], sections['valueHeap'])
+    return CodedColumn(sections['codes'], table, header['count'])
+  if kind == KIND_EDGE:
+    if header['doValues']:
+      table = (None, ) + (
+          tuple(sections['valueInts']) if header['dataType'] == 'int' else
+          _valuesFromHeap(sections['valueOffsets'], sections['valueHeap'])
+      )
+      (codes, invCodes) = (sections['codes'], sections['invCodes'])
+    else:
+      table = None
+      (codes, invCodes) = (None, None)
+    order = header.get('order', None)
+    inverse = EdgeColumn(
+        sections['invOffsets'], sections['invTargets'], invCodes, table, header['invCount'],
+        order=order,
+    )
+    return EdgeColumn(
+        sections['offsets'], sections['targets'], codes, table, header['count'], inverse, order
+    )
+  if kind == KIND_VALUE_INDEX:
+    values = (
+        tuple(sections['valueInts']) if header['dataType'] == 'int' else
+        _valuesFromHeap(sections['valueOffsets'], sections['valueHeap'])
+    )
+    return ValueIndex(
+        values, sections['offsets'], sections['nodes'], header['order'], header['source']
+    )
+  return None
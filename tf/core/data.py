@@ -1,16 +1,35 @@
 import os
 import pickle
 import gzip
+import struct
 import collections
 import time
 from datetime import datetime
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
 from ..parameters import PICKLE_PROTOCOL, GZIP_LEVEL
 from .helpers import (
     setFromSpec, valueFromTf, tfFromValue, specFromRanges, rangesFromSet, check32, console
 )
+from .columns import (
+    isColumnFile, readColumns, columnFromSections, writeNodeColumn, writeEdgeColumn,
+    compactNodeData, edgeColumn, valueIndex, writeValueIndex,
+    NodeColumn, IntColumn, CodedColumn, EdgeColumn, ValueIndex,
+)
+from .timestamp import Timestamp
+from .residency import dataSize
 
 ERROR_CUTOFF = 20
 
+# lines of a .tf file that are written in one go
+WRITE_CHUNK = 10000
+
+# the number of load records kept per feature, the most recent ones
+PROFILE_LENGTH = 100
+
+# pickled binaries hold (PICKLE_MARK, data), so that they can be told apart from the pickles
+# of earlier versions, which have the data in an older layout, see _upgradeDataBin()
+PICKLE_MARK = 'tf-data-2'
+
 WARP = (
     'otype',
     'oslots',
@@ -46,6 +65,7 @@ class Data(object):
     self.extension = extension
     self.binDir = f'{dirName}/.tf'
     self.binPath = f'{self.binDir}/{self.fileName}.tfx'
+    self.indexPath = f'{self.binDir}/{self.fileName}.tfi'
     self.edgeValues = edgeValues
     self.isEdge = isEdge
     self.isConfig = isConfig
@@ -53,12 +73,31 @@ class Data(object):
     self.method = method
     self.dependencies = dependencies
     self.data = data
+    # the nodes per value, see valueIndex()
+    self.index = None
     self.dataLoaded = False
     self.dataError = False
     self.dataType = 'str'
+    self.compiledElsewhere = False
+    # modification times of source and binary as recorded in a manifest
+    self.knownModified = None
+    # sizes of source and binary as recorded in a manifest
+    self.knownSizes = None
+    # metadata as recorded in a manifest, and as read from the .tf file
+    self.knownMeta = None
+    self.readMeta = None
+    # the bundle that holds the data of this feature, if any
+    self.bundle = None
+    # a record for the last times that load() had to do something, see profileRecord()
+    self.profile = collections.deque(maxlen=PROFILE_LENGTH)
 
   def load(self, metaOnly=False, silent=False):
     self.tm.indent(level=1, reset=True)
+    start = time.time()
+    timer = time.perf_counter()
+    timing = collections.Counter()
+    # writing the binary makes the recorded sizes stale, but the profile needs the old ones
+    knownSizes = self.knownSizes
     origTime = self._getModified()
     binTime = self._getModified(bin=True)
     sourceRep = ', '.join(
@@ -76,6 +115,13 @@ class Data(object):
     elif self.dataLoaded and (self.isConfig or ((not origTime or self.dataLoaded >= origTime) and
                                                 (not binTime or self.dataLoaded >= binTime))):
       actionRep = '='  # loaded and up to date
+    elif self.bundle is not None:
+      if self.isConfig or metaOnly:
+        actionRep = 'M'
+      else:
+        actionRep = 'B'
+        with _timed(timing, 'decompressTime'):
+          good = self._readDataBundle()
     elif not origTime and not binTime:
       actionRep = 'X'  # no source and no binary present
       good = False
@@ -83,32 +129,45 @@ class Data(object):
       try:
         if not origTime:
           actionRep = 'b'
-          good = self._readDataBin()
+          with _timed(timing, 'decompressTime'):
+            good = self._readDataBin()
         elif not binTime or origTime > binTime:
           actionRep = 'C' if self.method else 'T'
-          good = (
-              self._compute(metaOnly=metaOnly, silent=silent)
-              if self.method else
-              self._readTf(metaOnly=metaOnly)
-          )
+          with _timed(timing, 'parseTime'):
+            good = (
+                self._compute(metaOnly=metaOnly, silent=silent)
+                if self.method else
+                self._readTf(metaOnly=metaOnly)
+            )
           if good:
             if self.isConfig or metaOnly:
               actionRep = 'M'
             else:
-              self._writeDataBin()
+              with _timed(timing, 'writeTime'):
+                self._writeDataBin()
         else:
-          actionRep = 'B'
-          good = True if self.method else self._readTf(metaOnly=True)
+          # the binary may just have been compiled or computed by a worker process
+          actionRep = ('C' if self.method else 'T') if self.compiledElsewhere else 'B'
+          with _timed(timing, 'parseTime'):
+            good = True if self.method else self._readTf(metaOnly=True)
           if good:
             if self.isConfig or metaOnly:
               actionRep = 'M'
             else:
-              good = self._readDataBin()
+              with _timed(timing, 'decompressTime'):
+                good = self._readDataBin()
       except MemoryError:
         console(MEM_MSG)
         good = False
+    self.compiledElsewhere = False
     if self.isConfig:
       self.cleanDataBin()
+    if actionRep != '=':
+      self.profile.append(
+          self.profileRecord(
+              actionRep, good, start, time.perf_counter() - timer, timing, knownSizes
+          )
+      )
     if good:
       if (
           actionRep != '=' and
@@ -127,12 +186,106 @@ class Data(object):
       self.tm.error(msgFormat.format(actionRep, self.fileName, sourceRep))
     return good
 
+  def profileRecord(self, action, good, start, duration, timing, knownSizes=None):
+    # a summary of a load() that had to do something, in a form that can be dumped as json
+    # parseTime is the time for reading the .tf file, or for computing the data
+    # the size of the source is taken from the manifest when it is known there
+    sourceBytes = None
+    if action in 'TM' and not self.method:
+      source = self.path
+      if knownSizes is not None:
+        sourceBytes = knownSizes[0]
+    elif action in 'Bb':
+      source = self.bundle.path if self.bundle is not None else self.binPath
+      if knownSizes is not None:
+        sourceBytes = knownSizes[1]
+    else:
+      source = None
+    if self.bundle is not None:
+      sourceBytes = self.bundle.size(self.fileName) if action == 'B' else 0
+    elif sourceBytes is None:
+      sourceBytes = os.path.getsize(source) if source and os.path.exists(source) else None
+    return dict(
+        feature=self.fileName,
+        action=action,
+        good=good,
+        start=start,
+        time=duration,
+        source=source,
+        sourceBytes=sourceBytes,
+        parseTime=timing['parseTime'],
+        decompressTime=timing['decompressTime'],
+        writeTime=timing['writeTime'],
+        size=dataSize(self.data) if good and action not in 'MX' else 0,
+    )
+
+  def needsCompiling(self):
+    if self.isConfig or self.dataLoaded or self.dataError or self.bundle:
+      return False
+    origTime = self._getModified()
+    binTime = self._getModified(bin=True)
+    return bool(origTime) and (not binTime or origTime > binTime)
+
+  def setCompiledElsewhere(self):
+    # a worker process has written the binary: what the manifest says about it is stale
+    self.compiledElsewhere = True
+    self.knownModified = None
+    self.knownSizes = None
+
   def unload(self):
     self.data = None
+    self.index = None
     self.dataLoaded = False
 
-  def save(self, overwrite=False, nodeRanges=False):
-    return self._writeTf(overwrite=overwrite, nodeRanges=nodeRanges)
+  def valueIndex(self, order, signature):
+    # the nodes per value, sorted by order, the canonical order with rank signature signature;
+    # kept next to the binary, and made anew when the binary or the canonical order has changed
+    index = self.index
+    if index is not None and index.order == signature:
+      return index
+    source = None if self.bundle is not None else self._getModified(bin=True)
+    index = None
+    if source is not None and os.path.exists(self.indexPath):
+      columns = readColumns(self.indexPath)
+      if columns is not None:
+        index = columnFromSections(*columns)
+        if type(index) is not ValueIndex or index.order != signature or index.source != source:
+          index = None
+    if index is None:
+      index = valueIndex(self.data, order, signature, source)
+      if source is not None:
+        try:
+          writeValueIndex(self.indexPath, index, self.dataType)
+        except (OSError, struct.error, OverflowError, AttributeError, TypeError):
+          # values that do not fit the data type: keep the index in memory only
+          pass
+    self.index = index
+    return index
+
+  def sortEdges(self, rank, order):
+    data = self.data
+    if type(data) is not EdgeColumn or data.order == order:
+      return
+    self.data = data.rankSorted(rank, order)
+    if self.bundle is None:
+      self._writeDataBin()
+
+  def save(self, overwrite=False, nodeRanges=False, binary=False, writtenElsewhere=False):
+    if writtenElsewhere:
+      self.tm.indent(level=1, reset=True)
+      self._reportWrite(self.fileName, self.dirName, self.isConfig, True)
+      return True
+    good = self._writeTf(overwrite=overwrite, nodeRanges=nodeRanges)
+    if good and not self.isConfig:
+      # write the binary straight away, so that the first load does not have to compile
+      data = self._dataForBin() if binary else None
+      if data is not None:
+        self.data = data
+        self._writeDataBin()
+      else:
+        # a binary of a previous save must not pass for the compiled form of this one
+        self.cleanDataBin()
+    return good
 
   def _setDataType(self):
     if self.isConfig:
@@ -151,6 +304,14 @@ class Data(object):
 
   def _readTf(self, metaOnly=False):
     path = self.path
+    known = self.knownMeta
+    if known is not None and (metaOnly or known['isConfig']):
+      self.isEdge = known['isEdge']
+      self.isConfig = known['isConfig']
+      self.edgeValues = known['edgeValues']
+      self.metaData = dict(known['metaData'])
+      self._setDataType()
+      return True
     if not os.path.exists(path):
       self.tm.error(f'TF reading: feature file "{path}" does not exist')
       return False
@@ -189,6 +350,12 @@ class Data(object):
         else:
           break
     self._setDataType()
+    self.readMeta = dict(
+        isEdge=self.isEdge,
+        isConfig=self.isConfig,
+        edgeValues=self.edgeValues,
+        metaData=dict(self.metaData),
+    )
     good = True
     if not metaOnly and not self.isConfig:
       good = self._readDataTf(fh, i)
@@ -197,12 +364,125 @@ class Data(object):
 
   def _readDataTf(self, fh, firstI):
     errors = collections.defaultdict(list)
+    data = (
+        self._readEdgeLinesTf(fh, firstI, errors)
+        if self.isEdge else
+        self._readNodeLinesTf(fh, firstI, errors)
+    )
+    for kind in errors:
+      lnk = len(errors[kind])
+      self.tm.error(
+          '{} in lines {}'.format(kind, ','.join(str(ln) for ln in errors[kind][0:ERROR_CUTOFF]))
+      )
+      if lnk > ERROR_CUTOFF:
+        self.tm.error(f'\t and {lnk - ERROR_CUTOFF} more cases', tm=False)
+    self.data = data
+    if not errors:
+      (self.data, good) = self._compactData(data)
+      if not good:
+        errors = True
+    return not errors
+
+  def _compactData(self, data):
+    good = True
+    if self.fileName == WARP[0]:
+      slotType = data[1]
+      otype = []
+      maxSlot = 1
+      for n in sorted(data):
+        if data[n] == slotType:
+          maxSlot = n
+          continue
+        otype.append(data[n])
+      otype.append(slotType)
+      otype.append(maxSlot)
+      data = tuple(otype)
+    elif self.fileName == WARP[1]:
+      nodeList = sorted(data)
+      maxSlot = nodeList[0] - 1
+      maxNode = nodeList[-1]
+      nodeRange = maxNode - maxSlot
+      nodesMapped = len(nodeList)
+      if nodeRange > nodesMapped:
+        self.tm.error(f'ERROR: {WARP[1]} fails to map {nodeRange - nodesMapped} nodes')
+        good = False
+      elif nodeRange < nodesMapped:
+        # cannot happen because nodeList is a list of distinct keys
+        # so the min and max values of these keys must differ at least as much
+        # is the number of those keys
+        pass
+      oslots = []
+      for n in nodeList:
+        oslots.append(tuple(sorted(data[n])))
+      oslots.append(maxSlot)
+      data = tuple(oslots)
+    elif self.isEdge:
+      try:
+        data = edgeColumn(data, self.edgeValues)
+      except OverflowError:
+        pass
+    else:
+      data = compactNodeData(data, self.dataType)
+    return (data, good)
+
+  def _readNodeLinesTf(self, fh, firstI, errors):
+    # Fast path: most lines have an implicit node or a single node,
+    # and most values have no escapes. We avoid building node sets for them.
+    i = firstI
+    implicitNode = 1
+    data = {}
+    isNum = self.dataType == 'int'
+    for line in fh:
+      i += 1
+      line = line.rstrip('\n')
+      tab = line.find('\t')
+      if tab == -1:
+        n = implicitNode
+        valTf = line
+        spec = None
+      else:
+        valTf = line[tab + 1:]
+        if '\t' in valTf:
+          errors['wrongFields'].append(i)
+          continue
+        spec = line[0:tab]
+        if spec.isdigit():
+          n = int(spec)
+          spec = None
+      if isNum:
+        if valTf == '':
+          value = None
+        else:
+          value = int(valTf)
+      else:
+        value = valueFromTf(valTf) if '\\' in valTf else valTf
+      if spec is None:
+        if value is not None:
+          data[n] = value
+        implicitNode = n + 1
+      else:
+        bounds = spec.split('-')
+        if len(bounds) == 2 and bounds[0].isdigit() and bounds[1].isdigit():
+          b = int(bounds[0])
+          e = int(bounds[1])
+          if e < b:
+            (b, e) = (e, b)
+          nodes = range(b, e + 1)
+        else:
+          nodes = setFromSpec(spec)
+          e = max(nodes)
+        if value is not None:
+          for n in nodes:
+            data[n] = value
+        implicitNode = e + 1
+    return data
+
+  def _readEdgeLinesTf(self, fh, firstI, errors):
     i = firstI
     implicit_node = 1
     data = {}
-    isEdge = self.isEdge
     edgeValues = self.edgeValues
-    normFields = 3 if isEdge and edgeValues else 2
+    normFields = 3 if edgeValues else 2
     isNum = self.dataType == 'int'
     for line in fh:
       i += 1
@@ -213,107 +493,54 @@ class Data(object):
         continue
       if lfields == normFields:
         nodes = setFromSpec(fields[0])
-        if isEdge:
-          if fields[1] == '':
-            errors['emptyNode2Spec'].append(i)
-            continue
-          nodes2 = setFromSpec(fields[1])
-        if not isEdge or edgeValues:
+        if fields[1] == '':
+          errors['emptyNode2Spec'].append(i)
+          continue
+        nodes2 = setFromSpec(fields[1])
+        if edgeValues:
           valTf = fields[-1]
       else:
-        if isEdge:
-          if edgeValues:
-            if lfields == normFields - 1:
-              nodes = {implicit_node}
-              nodes2 = setFromSpec(fields[0])
-              valTf = fields[-1]
-            elif lfields == normFields - 2:
-              nodes = {implicit_node}
-              if fields[0] == '':
-                errors['emptyNode2Spec'].append(i)
-                continue
-              nodes2 = setFromSpec(fields[0])
-              valTf = ''
-            else:
-              nodes = {implicit_node}
-              valTf = ''
+        if edgeValues:
+          if lfields == normFields - 1:
+            nodes = {implicit_node}
+            nodes2 = setFromSpec(fields[0])
+            valTf = fields[-1]
+          elif lfields == normFields - 2:
+            nodes = {implicit_node}
+            if fields[0] == '':
               errors['emptyNode2Spec'].append(i)
               continue
+            nodes2 = setFromSpec(fields[0])
+            valTf = ''
           else:
-            if lfields == normFields - 1:
-              nodes = {implicit_node}
-              if fields[0] == '':
-                errors['emptyNode2Spec'].append(i)
-                continue
-              nodes2 = setFromSpec(fields[0])
-            else:
-              nodes = {implicit_node}
+            nodes = {implicit_node}
+            valTf = ''
+            errors['emptyNode2Spec'].append(i)
+            continue
+        else:
+          if lfields == normFields - 1:
+            nodes = {implicit_node}
+            if fields[0] == '':
               errors['emptyNode2Spec'].append(i)
               continue
-        else:
-          nodes = {implicit_node}
-          if lfields == 1:
-            valTf = fields[0]
+            nodes2 = setFromSpec(fields[0])
           else:
-            valTf = ''
+            nodes = {implicit_node}
+            errors['emptyNode2Spec'].append(i)
+            continue
       implicit_node = max(nodes) + 1
-      if not isEdge or edgeValues:
+      if edgeValues:
         value = (
             int(valTf) if isNum and valTf != '' else
             None if isNum else '' if valTf == '' else valueFromTf(valTf)
         )
-      if isEdge:
-        for n in nodes:
-          for m in nodes2:
-            if not edgeValues:
-              data.setdefault(n, set()).add(m)
-            else:
-              data.setdefault(n, {})[m] = value  # even if the value is None
-      else:
-        for n in nodes:
-          if value is not None:
-            data[n] = value
-    for kind in errors:
-      lnk = len(errors[kind])
-      self.tm.error(
-          '{} in lines {}'.format(kind, ','.join(str(ln) for ln in errors[kind][0:ERROR_CUTOFF]))
-      )
-      if lnk > ERROR_CUTOFF:
-        self.tm.error(f'\t and {lnk - ERROR_CUTOFF} more cases', tm=False)
-    self.data = data
-    if not errors:
-      if self.fileName == WARP[0]:
-        slotType = data[1]
-        otype = []
-        maxSlot = 1
-        for n in sorted(data):
-          if data[n] == slotType:
-            maxSlot = n
-            continue
-          otype.append(data[n])
-        otype.append(slotType)
-        otype.append(maxSlot)
-        self.data = tuple(otype)
-      elif self.fileName == WARP[1]:
-        nodeList = sorted(data)
-        maxSlot = nodeList[0] - 1
-        maxNode = nodeList[-1]
-        nodeRange = maxNode - maxSlot
-        nodesMapped = len(nodeList)
-        if nodeRange > nodesMapped:
-          self.tm.error(f'ERROR: {WARP[1]} fails to map {nodeRange - nodesMapped} nodes')
-          errors = True
-        elif nodeRange < nodesMapped:
-          # cannot happen because nodeList is a list of distinct keys
-          # so the min and max values of these keys must differ at least as much
-          # is the number of those keys
-          pass
-        oslots = []
-        for n in nodeList:
-          oslots.append(tuple(sorted(data[n])))
-        oslots.append(maxSlot)
-        self.data = tuple(oslots)
-    return not errors
+      for n in nodes:
+        for m in nodes2:
+          if not edgeValues:
+            data.setdefault(n, set()).add(m)
+          else:
+            data.setdefault(n, {})[m] = value  # even if the value is None
+    return data
 
   def _compute(self, metaOnly=False, silent=False):
     if metaOnly:
@@ -384,14 +611,18 @@ class Data(object):
     if not metaOnly:
       good = self._writeDataTf(fh, nodeRanges=nodeRanges)
     fh.close()
-    msgFormat = '{:<1} {:<20} to {}'
+    self._reportWrite(fileName, dirName, metaOnly, good)
+    return good
+
+  def _reportWrite(self, fileName, dirName, metaOnly, good):
+    msg = '{:<1} {:<20} to {}'.format('M' if metaOnly else 'T', fileName, dirName)
     if good:
-      self.tm.info(msgFormat.format('M' if metaOnly else 'T', fileName, dirName))
+      self.tm.info(msg)
     else:
-      self.tm.error(msgFormat.format('M' if metaOnly else 'T', fileName, dirName))
-    return good
+      self.tm.error(msg)
 
   def _writeDataTf(self, fh, nodeRanges=False):
+    # lines are collected and written in chunks
     data = self.data
     if type(data) is tuple:
       maxSlot = data[-1]
@@ -400,38 +631,31 @@ class Data(object):
       elif self.fileName == WARP[1]:
         data = dict(((k + 1 + maxSlot, data[k]) for k in range(0, len(data) - 1)))
     edgeValues = self.edgeValues
+    lines = []
     if self.isEdge:
       implicitNode = 1
       for n in sorted(data):
         thisData = data[n]
-        sets = {}
         if edgeValues:
-          for m in thisData:
-            sets.setdefault(thisData[m], set()).add(m)
+          sets = {}
+          for (m, value) in thisData.items():
+            sets.setdefault(value, set()).add(m)
           for (value, mset) in sorted(sets.items()):
-            nodeSpec2 = specFromRanges(rangesFromSet(mset))
-            nodeSpec = '' if n == implicitNode else n
+            nodeSpec2 = _specFromSet(mset)
+            nodeSpec = '' if n == implicitNode else f'{n}\t'
             implicitNode = n + 1
             if value is None:
-              fh.write('{}{}{}\n'.format(
-                  nodeSpec,
-                  '\t' if nodeSpec else '',
-                  nodeSpec2,
-              ))
+              lines.append(f'{nodeSpec}{nodeSpec2}\n')
             else:
-              fh.write(
-                  '{}{}{}\t{}\n'.format(
-                      nodeSpec,
-                      '\t' if nodeSpec else '',
-                      nodeSpec2,
-                      tfFromValue(value),
-                  )
-              )
+              lines.append(f'{nodeSpec}{nodeSpec2}\t{tfFromValue(value)}\n')
         else:
-          nodeSpec2 = specFromRanges(rangesFromSet(thisData))
-          nodeSpec = '' if n == implicitNode else n
+          nodeSpec2 = _specFromSet(thisData)
+          nodeSpec = '' if n == implicitNode else f'{n}\t'
           implicitNode = n + 1
-          fh.write('{}{}{}\n'.format(nodeSpec, '\t' if nodeSpec else '', nodeSpec2))
+          lines.append(f'{nodeSpec}{nodeSpec2}\n')
+        if len(lines) >= WRITE_CHUNK:
+          fh.write(''.join(lines))
+          lines = []
     else:
       sets = {}
       if nodeRanges:
@@ -442,37 +666,113 @@ class Data(object):
           if len(nset) == 1 and nset[0] == implicitNode:
             nodeSpec = ''
           else:
-            nodeSpec = specFromRanges(rangesFromSet(nset))
+            nodeSpec = specFromRanges(rangesFromSet(nset)) + '\t'
           implicitNode = nset[-1]
-          fh.write('{}{}{}\n'.format(
-              nodeSpec,
-              '\t' if nodeSpec else '',
-              tfFromValue(value),
-          ))
+          lines.append(f'{nodeSpec}{tfFromValue(value)}\n')
       else:
         implicitNode = 1
         for n in sorted(data):
-          nodeSpec = '' if n == implicitNode else n
+          nodeSpec = '' if n == implicitNode else f'{n}\t'
           implicitNode = n + 1
-          fh.write('{}{}{}\n'.format(
-              nodeSpec,
-              '\t' if nodeSpec else '',
-              tfFromValue(data[n]),
-          ))
+          lines.append(f'{nodeSpec}{tfFromValue(data[n])}\n')
+          if len(lines) >= WRITE_CHUNK:
+            fh.write(''.join(lines))
+            lines = []
+    fh.write(''.join(lines))
     return True
 
+  def _dataForBin(self):
+    # the data as it will be after reading back the .tf file,
+    # or None if the data does not survive the round trip unchanged:
+    # then the binary will be compiled from the .tf file on first load
+    data = self.data
+    if type(data) is tuple:
+      return data if self.fileName in WARP else None
+    if type(data) is not dict or not data:
+      return None
+    isNum = self.dataType == 'int'
+    if self.isEdge:
+      if self.edgeValues:
+        if any(type(row) is not dict or not row for row in data.values()):
+          return None
+        valueTypes = {type(v) for row in data.values() for v in row.values()}
+        if not valueTypes <= ({int, type(None)} if isNum else {str}):
+          return None
+        if not isNum and any('\r' in v for row in data.values() for v in row.values()):
+          return None
+      elif any(type(row) not in {set, frozenset} or not row for row in data.values()):
+        return None
+    else:
+      if {type(v) for v in data.values()} != ({int} if isNum else {str}):
+        return None
+      if not isNum and any('\r' in v for v in data.values()):
+        return None
+      if self.fileName != WARP[0]:
+        data = {n: data[n] for n in sorted(data)}
+    (data, good) = self._compactData(data)
+    return data if good else None
+
   def _readDataBin(self):
     if not os.path.exists(self.binPath):
       self.tm.error(f'TF reading: feature file "{self.binPath}" does not exist')
       return False
-    with gzip.open(self.binPath, "rb") as f:
-      self.data = pickle.load(f)
+    if isColumnFile(self.binPath):
+      columns = readColumns(self.binPath)
+      data = None if columns is None else columnFromSections(*columns)
+      if data is None:
+        # a column file written by another version of TF or on another platform
+        if not os.path.exists(self.path) or not self._readTf():
+          self.tm.error(f'TF reading: cannot interpret feature file "{self.binPath}"')
+          return False
+        return self._writeDataBin()
+      self.data = data
+    else:
+      with gzip.open(self.binPath, "rb") as f:
+        data = pickle.load(f)
+      if type(data) is tuple and len(data) == 2 and data[0] == PICKLE_MARK:
+        self.data = data[1]
+      else:
+        return self._upgradeDataBin(data)
     self.dataLoaded = time.time()
     return True
 
+  def _upgradeDataBin(self, data):
+    # a binary written by an earlier version of TF: bring the data in the current layout,
+    # and replace the binary, so that this happens only once
+    if self.method:
+      if not self._compute():
+        return False
+    elif type(data) is dict and self.fileName not in WARP:
+      self.data = self._compactData(data)[0]
+    else:
+      self.data = data
+    return self._writeDataBin()
+
+  def _readDataBundle(self):
+    data = self.bundle.read(self.fileName)
+    if data is None:
+      self.tm.error(f'TF reading: no data for feature "{self.fileName}" in "{self.bundle.path}"')
+      return False
+    self.data = data
+    self.dataLoaded = time.time()
+    return True
+
+  def isColumnar(self):
+    columnTypes = {dict, EdgeColumn} if self.isEdge else {dict, NodeColumn, IntColumn, CodedColumn}
+    return (
+        not self.method and not self.isConfig and self.fileName not in WARP and
+        type(self.data) in columnTypes
+    )
+
   def cleanDataBin(self):
+    if self.knownModified is not None and self.knownModified[1] is None:
+      return
     if os.path.exists(self.binPath):
+      self.knownModified = None
+      self.knownSizes = None
       os.unlink(self.binPath)
+    if os.path.exists(self.indexPath):
+      os.unlink(self.indexPath)
 
   def _writeDataBin(self):
     good = True
@@ -484,9 +784,27 @@ class Data(object):
         good = False
     if not good:
       return False
+    self.knownModified = None
+    self.knownSizes = None
+    if self.isColumnar():
+      try:
+        if self.isEdge:
+          writeEdgeColumn(self.binPath, self.data, self.dataType, self.edgeValues)
+        else:
+          writeNodeColumn(self.binPath, self.data, self.dataType)
+        self.dataLoaded = time.time()
+        return True
+      except (struct.error, OverflowError):
+        # values that do not fit in a column: fall back on a pickled dict
+        pass
+      except OSError as e:
+        # the data stays in memory, only the binary is missing
+        self.tm.error(f'Cannot write to file "{self.binPath}" because: {str(e)}')
+        self.dataLoaded = time.time()
+        return True
     try:
       with gzip.open(self.binPath, "wb", compresslevel=GZIP_LEVEL) as f:
-        pickle.dump(self.data, f, protocol=PICKLE_PROTOCOL)
+        pickle.dump((PICKLE_MARK, self.data), f, protocol=PICKLE_PROTOCOL)
     except Exception as e:
       self.tm.error(f'Cannot write to file "{self.binPath}" because: {str(e)}')
       self.cleanDataBin()
@@ -495,7 +813,10 @@ class Data(object):
     return True
 
   def _getModified(self, bin=False):
+    known = self.knownModified
     if bin:
+      if known is not None:
+        return known[1]
       return os.path.getmtime(self.binPath) if os.path.exists(self.binPath) else None
     else:
       if self.method:
@@ -504,14 +825,56 @@ class Data(object):
         depsModified = None if len(depsModifieds) == 0 else max(depsModifieds)
         if depsModified is not None:
           return depsModified
-        elif os.path.exists(self.binPath):
-          return os.path.getmtime(self.binPath)
         else:
-          return None
+          return self._getModified(bin=True)
       else:
+        if known is not None:
+          return known[0] if known[0] is not None else known[1]
         if os.path.exists(self.path):
           return os.path.getmtime(self.path)
         elif os.path.exists(self.binPath):
           return os.path.getmtime(self.binPath)
         else:
           return None
+
+
+@contextmanager
+def _timed(timing, key):
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    timing[key] += time.perf_counter() - start
+
+
+def _specFromSet(nodeSet):
+  if len(nodeSet) == 1:
+    for n in nodeSet:
+      return str(n)
+  return specFromRanges(rangesFromSet(nodeSet))
+
+
+def compileFeature(path):
+  # runs in a worker process: compile a feature file into its binary
+  # messages are discarded: if compiling fails, the feature will be compiled again
+  # by the calling process, and then the messages will be reported in the normal way
+  with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+    good = Data(path, Timestamp()).load(silent=True)
+  return good
+
+
+def saveFeature(path, data, metaData, isEdge, isConfig, edgeValues, nodeRanges):
+  # runs in a worker process: write a feature file and its binary
+  # messages are discarded, as in compileFeature
+  with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+    fObj = Data(
+        path,
+        Timestamp(),
+        data=data,
+        metaData=metaData,
+        isEdge=isEdge,
+        isConfig=isConfig,
+        edgeValues=edgeValues,
+    )
+    good = fObj.save(overwrite=True, nodeRanges=nodeRanges, binary=True)
+  return good
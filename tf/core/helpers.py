@@ -112,6 +112,8 @@ def expandDir(obj, dirName):
 
 
 def setFromSpec(spec):
+  if spec.isdigit():
+    return {int(spec)}
   covered = set()
   for r_str in spec.split(','):
     bounds = r_str.split('-')
@@ -244,8 +246,7 @@ def compileFormat(rtpl, feats, features):
     replaceFuncs.append(makeFunc(feat, features))
 
   def g(n):
-    values = tuple(replaceFunc(n) for replaceFunc in replaceFuncs)
-    return rtpl.format(*values)
+    return rtpl.format(*[replaceFunc(n) for replaceFunc in replaceFuncs])
 
   return g
 
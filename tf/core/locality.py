@@ -1,7 +1,41 @@
+from array import array
+
+# LOCALITY INDEXES
+#
+# The embedders of a given type (u) and the embedded nodes (d), all or of a given type,
+# are looked up in indexes, one for each pair of the type of the node and the requested type.
+# An index is made on first use, out of the results of _scan() for all nodes of the type,
+# and holds them back to back, in canonical order:
+# (first, offsets, nodes), where the result for node n is nodes[offsets[i]:offsets[i + 1]]
+# with i = n - first.
+# The embedders of any type (u without a type) are the rows of levUp, which is stored compactly:
+# on first use they are turned into a tuple of tuples, in which equal rows are shared,
+# so that a lookup is an index operation, without building a tuple for each call.
+
+
+def localityIndex(first, last, scan):
+  offsets = array('Q', [0])
+  nodes = array('I')
+  for n in range(first, last + 1):
+    nodes.extend(scan(n))
+    offsets.append(len(nodes))
+  return (first, offsets, nodes)
+
+
+def rowTuples(rows):
+  if type(rows) is tuple:
+    return rows
+  shared = {}
+  return tuple(shared.setdefault(row, row) for row in rows)
+
+
 class Locality(object):
 
   def __init__(self, api):
     self.api = api
+    self._indexes = {}
+    self._typeIndex = None
+    self._up = None
 
   def u(self, n, otype=None):
     if n <= 0:
@@ -10,12 +44,13 @@ class Locality(object):
     maxNode = Fotype.maxNode
     if n > maxNode:
       return tuple()
-    levUp = self.api.C.levUp.data
 
     if otype is None:
-      return levUp[n - 1]
+      if self._up is None:
+        self._up = rowTuples(self.api.C.levUp.data)
+      return self._up[n - 1]
     else:
-      return tuple(m for m in levUp[n - 1] if Fotype.v(m) == otype)
+      return self._indexed('u', n, otype)
 
   def d(self, n, otype=None):
     Fotype = self.api.F.otype
@@ -26,22 +61,49 @@ class Locality(object):
     if n > maxNode:
       return tuple()
 
+    return self._indexed('d', n, otype)
+
+  def _indexed(self, direction, n, otype):
+    if self._typeIndex is None:
+      self._typeIndex = self.api.F.otype.typeIndex()
+    (types, typeIndex) = self._typeIndex
+    key = (direction, typeIndex[n], otype)
+    index = self._indexes.get(key, None)
+    if index is None:
+      Fotype = self.api.F.otype
+      if otype is not None and otype not in Fotype.support:
+        return tuple()
+      (first, last) = Fotype.sInterval(types[key[1]])
+      index = localityIndex(first, last, self._scan(direction, otype))
+      self._indexes[key] = index
+    (first, offsets, nodes) = index
+    i = n - first
+    return tuple(nodes[offsets[i]:offsets[i + 1]])
+
+  def _scan(self, direction, otype):
+    # a function that computes the result of u() or d() for a single node
+    Fotype = self.api.F.otype
+    maxSlot = Fotype.maxSlot
+    (types, typeIndex) = Fotype.typeIndex()
+    t = None if otype is None else types.index(otype)
+    if direction == 'u':
+      levUp = self.api.C.levUp.data
+      return lambda n: (m for m in levUp[n - 1] if typeIndex[m] == t)
     Eoslots = self.api.E.oslots
     Crank = self.api.C.rank.data
     levDown = self.api.C.levDown.data
-    slotType = Fotype.slotType
     if otype is None:
-      return sorted(
+      return lambda n: sorted(
           levDown[n - maxSlot - 1] + Eoslots.s(n),
           key=lambda m: Crank[m - 1],
       )
-    elif otype == slotType:
-      return sorted(
+    elif otype == Fotype.slotType:
+      return lambda n: sorted(
           Eoslots.s(n),
           key=lambda m: Crank[m - 1],
       )
     else:
-      return tuple(m for m in levDown[n - maxSlot - 1] if Fotype.v(m) == otype)
+      return lambda n: (m for m in levDown[n - maxSlot - 1] if typeIndex[m] == t)
 
   def p(self, n, otype=None):
     if n <= 1:
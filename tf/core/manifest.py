@@ -0,0 +1,96 @@
+import os
+import json
+
+# CACHE MANIFEST
+#
+# A manifest in the .tf directory next to the .tf files of a module
+# records the modification times of those .tf files and of the compiled .tfx files.
+# It also records the modification times of the two directories themselves.
+# As long as those have not changed, no files have been added, removed or replaced,
+# and the recorded times are taken for granted: one read instead of a stat per file.
+#
+# Modifications of a .tf file in place do not change the modification time of the
+# directory, so they are not detected when manifests are used.
+#
+# The sizes of those files are recorded as well, for the load profile (see Data.profileRecord()).
+#
+# The manifest is overwritten in place, which leaves the modification time of the
+# .tf directory intact.
+#
+# The manifest also holds the metadata of the features (see metaEntry()),
+# each entry with the modification time of the .tf file it has been read from.
+# An entry is only used while that time is still the one recorded for the file.
+
+MANIFEST = '__manifest__.json'
+MANIFEST_VERSION = 2
+
+
+def readManifest(dirName):
+  binDir = f'{dirName}/.tf'
+  try:
+    with open(f'{binDir}/{MANIFEST}', encoding='utf8') as fh:
+      manifest = json.load(fh)
+    if (
+        manifest['version'] != MANIFEST_VERSION or
+        manifest['dirModified'] != os.stat(dirName).st_mtime_ns or
+        manifest['binDirModified'] != os.stat(binDir).st_mtime_ns
+    ):
+      return None
+  except (OSError, ValueError, KeyError, TypeError):
+    return None
+  return manifest
+
+
+def writeManifest(dirName, meta={}):
+  binDir = f'{dirName}/.tf'
+  path = f'{binDir}/{MANIFEST}'
+  try:
+    if not os.path.exists(path):
+      os.makedirs(binDir, exist_ok=True)
+      open(path, 'w').close()
+    (files, fileSizes) = _stats(dirName, '.tf')
+    (bins, binSizes) = _stats(binDir, '.tfx')
+    manifest = dict(
+        version=MANIFEST_VERSION,
+        dirModified=os.stat(dirName).st_mtime_ns,
+        binDirModified=os.stat(binDir).st_mtime_ns,
+        files=files,
+        bins=bins,
+        fileSizes=fileSizes,
+        binSizes=binSizes,
+        meta={
+            fName: entry
+            for (fName, entry) in meta.items()
+            if entry['modified'] == files.get(fName, None)
+        },
+    )
+    with open(path, 'r+', encoding='utf8') as fh:
+      fh.truncate()
+      json.dump(manifest, fh, ensure_ascii=False)
+  except OSError:
+    return False
+  return True
+
+
+def metaEntry(fObj):
+  return dict(modified=os.path.getmtime(fObj.path), **fObj.readMeta)
+
+
+def knownMeta(manifest, fName):
+  entry = manifest.get('meta', {}).get(fName, None)
+  if entry is None or entry['modified'] != manifest['files'].get(fName, None):
+    return None
+  return entry
+
+
+def _stats(dirName, extension):
+  modifieds = {}
+  sizes = {}
+  with os.scandir(dirName) as it:
+    for entry in it:
+      (fName, ext) = os.path.splitext(entry.name)
+      if ext == extension and entry.is_file():
+        stat = entry.stat()
+        modifieds[fName] = stat.st_mtime
+        sizes[fName] = stat.st_size
+  return (modifieds, sizes)
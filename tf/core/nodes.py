@@ -0,0 +1,89 @@
+import collections
+from array import array
+from bisect import bisect_left
+from itertools import filterfalse, compress, chain
+from operator import ne
+
+# NODE SETS
+#
+# A set of nodes kept in canonical order: as the sorted array of the ranks of its nodes,
+# so that C.order.data[r] is the node with rank r.
+# Iterating over a node set delivers its nodes in canonical order without sorting.
+# The set operations work on the rank arrays and keep them sorted:
+# a union merges two sorted runs, an intersection or difference filters one array,
+# all in linear time.
+# Membership is a binary search.
+# Numbers outside 1 .. maxNode are not nodes: they are left out.
+
+
+class NodeSet(collections.abc.Set):
+
+  def __init__(self, api, nodes=()):
+    self.api = api
+    if type(nodes) is NodeSet:
+      self.ranks = nodes.ranks
+    else:
+      rank = api.C.rank.data
+      maxNode = len(rank)
+      self.ranks = array(
+          'I', sorted(set(map(rank.__getitem__, (n - 1 for n in nodes if 0 < n <= maxNode))))
+      )
+
+  def _fromRanks(self, ranks):
+    nodeSet = NodeSet(self.api)
+    nodeSet.ranks = ranks
+    return nodeSet
+
+  def _from_iterable(self, nodes):
+    return NodeSet(self.api, nodes)
+
+  def _ranksOf(self, other):
+    return other.ranks if type(other) is NodeSet else NodeSet(self.api, other).ranks
+
+  def __iter__(self):
+    return map(self.api.C.order.data.__getitem__, self.ranks)
+
+  def __reversed__(self):
+    return map(self.api.C.order.data.__getitem__, reversed(self.ranks))
+
+  def __len__(self):
+    return len(self.ranks)
+
+  def __contains__(self, n):
+    rank = self.api.C.rank.data
+    if type(n) is not int or not 0 < n <= len(rank):
+      return False
+    r = rank[n - 1]
+    ranks = self.ranks
+    i = bisect_left(ranks, r)
+    return i < len(ranks) and ranks[i] == r
+
+  def __eq__(self, other):
+    if type(other) is NodeSet:
+      return self.ranks == other.ranks
+    return super().__eq__(other)
+
+  def __repr__(self):
+    return f'NodeSet({list(self)})'
+
+  def __or__(self, other):
+    return self.union(other)
+
+  def __and__(self, other):
+    return self.intersection(other)
+
+  def __sub__(self, other):
+    return self.difference(other)
+
+  def union(self, other):
+    # sorting two sorted runs is a single merge, after which duplicates are neighbours
+    ranks = sorted(self.ranks + self._ranksOf(other))
+    return self._fromRanks(array('I', compress(ranks, chain((True, ), map(ne, ranks[1:], ranks)))))
+
+  def intersection(self, other):
+    return self._fromRanks(array('I', filter(set(self._ranksOf(other)).__contains__, self.ranks)))
+
+  def difference(self, other):
+    return self._fromRanks(
+        array('I', filterfalse(set(self._ranksOf(other)).__contains__, self.ranks))
+    )
@@ -1,7 +1,8 @@
 import array
+import bisect
 import collections
-import functools
 from .helpers import itemize
+from .columns import RowColumn
 
 
 def getOtypeInfo(info, otype):
@@ -48,37 +49,20 @@ def order(info, error, otype, oslots, levels):
   info('assigning otype levels to nodes')
   otypeLevels = dict(((x[0], i) for (i, x) in enumerate(levels)))
 
-  def otypeRank(n):
-    return otypeLevels[slotType if n < maxSlot + 1 else otype[n - maxSlot - 1]]
-
-  def before(na, nb):
-    if na < maxSlot + 1:
-      a = na
-      sa = {a}
-    else:
-      a = na - maxSlot
-      sa = set(oslots[a - 1])
-    if nb < maxSlot + 1:
-      b = nb
-      sb = {b}
-    else:
-      b = nb - maxSlot
-      sb = set(oslots[b - 1])
-    oa = otypeRank(na)
-    ob = otypeRank(nb)
-    if sa == sb:
-      return 0 if oa == ob else -1 if oa < ob else 1
-    if sa > sb:
-      return -1
-    if sa < sb:
-      return 1
-    am = min(sa - sb)
-    bm = min(sb - sa)
-    return -1 if am < bm else 1 if bm < am else None
-
-  canonKey = functools.cmp_to_key(before)
+  # A node comes before another node if its slots, in slot order and followed by
+  # a number that is bigger than all slots, are lexicographically smaller.
+  # So embedders come before the nodes they embed, and otherwise the first slot
+  # where the slot sets differ decides.
+  # Nodes with the same slots are ordered by the levels of their otypes.
+
+  end = maxSlot + 1
+  endTuple = (end, )
+  slotLevel = otypeLevels[slotType]
+  keys = [None]
+  keys.extend(((n, end), slotLevel) for n in range(1, maxSlot + 1))
+  keys.extend((oslots[k] + endTuple, otypeLevels[otype[k]]) for k in range(maxNode - maxSlot))
   info('sorting nodes')
-  nodes = sorted(range(1, maxNode + 1), key=canonKey)
+  nodes = sorted(range(1, maxNode + 1), key=keys.__getitem__)
   return array.array('I', nodes)
 
 
@@ -91,48 +75,70 @@ def rank(info, error, otype, order):
 
 def levUp(info, error, otype, oslots, levels, rank):
   (slotType, maxSlot, maxNode) = getOtypeInfo(info, otype)
-  info('making inverse of edge feature oslots')
-  oslotsInv = {}
+
+  # We sweep over the slots, and keep the nodes whose first and last slot
+  # enclose the current slot active, ordered by descending rank.
+  # The embedders of the current slot are the active nodes
+  # except the nodes with gaps that miss the slot.
+  # The embedders of a node that starts at the current slot are the active
+  # nodes that end at or after the last slot of that node,
+  # except the nodes with gaps that miss some of its slots.
+
+  info('sorting nodes by first slot')
+  starters = {}
   for (k, mList) in enumerate(oslots[0:-1]):
-    for m in mList:
-      oslotsInv.setdefault(m, set()).add(k + 1 + maxSlot)
+    if mList:
+      starters.setdefault(mList[0], []).append(k + 1 + maxSlot)
   info('listing embedders of all nodes')
-  embedders = []
-  for n in range(1, maxSlot + 1):
-    contentEmbedders = oslotsInv[n]
-    embedders.append(
-        tuple(
-            sorted(
-                [
-                    m for m in contentEmbedders if m != n
-                    # if rank[m - 1] < rank[n - 1]
-                ],
-                key=lambda k: -rank[k - 1],
-            )
-        )
-    )
-  for n in range(maxSlot + 1, maxNode + 1):
-    mList = oslots[n - maxSlot - 1]
-    if len(mList) == 0:
-      embedders.append(tuple())
-    else:
-      contentEmbedders = functools.reduce(
-          lambda x, y: x & oslotsInv[y],
-          mList[1:],
-          oslotsInv[mList[0]],
-      )
-      embedders.append(
-          tuple(
-              sorted(
-                  [
-                      m for m in contentEmbedders if m != n
-                      # if rank[m - 1] < rank[n - 1]
-                  ],
-                  key=lambda k: -rank[k - 1],
-              )
-          )
+  embedders = array.array('I')
+  start = array.array('Q', [0]) * (maxNode + 1)
+  stop = array.array('Q', [0]) * (maxNode + 1)
+
+  active = []
+  activeKeys = []
+  lasts = {}
+  gapped = {}
+  enders = {}
+  for s in range(1, maxSlot + 1):
+    newNodes = starters.get(s, ())
+    for m in newNodes:
+      mList = oslots[m - maxSlot - 1]
+      last = mList[-1]
+      key = -rank[m - 1]
+      i = bisect.bisect(activeKeys, key)
+      activeKeys.insert(i, key)
+      active.insert(i, m)
+      lasts[m] = last
+      enders.setdefault(last, []).append(m)
+      if len(mList) != last - mList[0] + 1:
+        gapped[m] = frozenset(mList)
+    start[s] = len(embedders)
+    embedders.extend(m for m in active if m not in gapped or s in gapped[m])
+    stop[s] = len(embedders)
+    for n in newNodes:
+      nList = oslots[n - maxSlot - 1]
+      nLast = nList[-1]
+      start[n] = len(embedders)
+      embedders.extend(
+          m for m in active
+          if lasts[m] >= nLast and m != n and (m not in gapped or gapped[m].issuperset(nList))
       )
-  return tuple(embedders)
+      stop[n] = len(embedders)
+    for m in enders.pop(s, ()):
+      i = active.index(m)
+      del active[i]
+      del activeKeys[i]
+      del lasts[m]
+      gapped.pop(m, None)
+
+  info('storing embedders in node order')
+  offsets = array.array('Q', [0]) * (maxNode + 1)
+  values = array.array('I')
+  for n in range(1, maxNode + 1):
+    offsets[n - 1] = len(values)
+    values.extend(embedders[start[n]:stop[n]])
+  offsets[maxNode] = len(values)
+  return RowColumn(offsets, values)
 
 
 def levDown(info, error, otype, levUp, rank):
@@ -167,6 +173,22 @@ def boundary(info, error, otype, oslots, rank):
   return (tuple(firstSlots), tuple(lastSlots))
 
 
+def sectionTable(info, error, otype, otext, levUp, *sFeats):
+  # for every section type and every slot the first section of that type that contains the slot:
+  # the section of type i of slot s is at i * maxSlot + s - 1, 0 if there is none
+  (slotType, maxSlot, maxNode) = getOtypeInfo(info, otype)
+  sTypes = itemize(otext['sectionTypes'], ',')
+  levelFromType = {sType: i for (i, sType) in enumerate(sTypes)}
+  table = array.array('I', [0]) * (len(sTypes) * maxSlot)
+  for s in range(1, maxSlot + 1):
+    for x in levUp[s - 1]:
+      i = levelFromType.get(otype[x - maxSlot - 1], None)
+      if i is not None and not table[i * maxSlot + s - 1]:
+        table[i * maxSlot + s - 1] = x
+  info(f'sections of {maxSlot} slots tabulated')
+  return table
+
+
 def sections(info, error, otype, oslots, otext, levUp, levels, *sFeats):
   (slotType, maxSlot, maxNode) = getOtypeInfo(info, otype)
   support = dict(((o[0], (o[2], o[3])) for o in levels))
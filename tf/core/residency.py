@@ -0,0 +1,122 @@
+import sys
+import collections
+from array import array
+from itertools import islice, count
+
+# RESIDENCY
+#
+# Keeps the memory taken by the features in the F and E namespaces of an api
+# under a budget.
+# Every feature that enters a namespace is admitted with an estimate of its size,
+# every access to it counts as a use.
+# When the estimated total exceeds the budget, the least recently used features
+# are unloaded, except the ones that Fabric needs to keep (WARP features,
+# section and format features).
+# The namespaces are lazy, so an evicted feature is loaded again from its binary
+# on its next use.
+
+SAMPLE = 100
+
+
+def dataSize(data, depth=0):
+  # an estimate of the memory taken by feature data, in bytes
+  # big containers are estimated by a sample of their members
+  if data is None:
+    return 0
+  if type(data) is array:
+    return sys.getsizeof(data)
+  if type(data) is memoryview:
+    return data.nbytes
+  if type(data) in {str, bytes, bytearray, int, float, bool}:
+    return sys.getsizeof(data)
+  if isinstance(data, (dict, set, frozenset, tuple, list)):
+    size = sys.getsizeof(data)
+    n = len(data)
+    if n == 0 or depth > 3:
+      return size
+    if isinstance(data, (tuple, list)):
+      # spread the sample, and stay away from the start:
+      # node ordered data has its few big nodes first
+      step = max(n // SAMPLE, 1)
+      members = data[step // 2::step]
+    elif isinstance(data, dict):
+      members = islice(data.items(), SAMPLE)
+    else:
+      members = islice(data, SAMPLE)
+    # members that occur more than once in the sample are shared values, count them once
+    seen = set()
+    sampleSize = 0
+    sampleN = 0
+    for member in members:
+      sampleN += 1
+      if id(member) not in seen:
+        seen.add(id(member))
+        sampleSize += dataSize(member, depth=depth + 1)
+    return size + sampleSize * n // sampleN
+  if hasattr(data, '__dict__') and depth <= 3:
+    # the column types of columns.py
+    return sys.getsizeof(data) + sum(
+        dataSize(value, depth=depth + 1)
+        for (name, value) in vars(data).items()
+        if not name.startswith('_')
+    )
+  return sys.getsizeof(data)
+
+
+def featureSize(feature):
+  size = dataSize(feature.data)
+  dataInv = getattr(feature, 'dataInv', None)
+  if dataInv is not None and dataInv is not getattr(feature.data, 'inverse', None):
+    size += dataSize(dataInv)
+  return size
+
+
+class Residency(object):
+
+  def __init__(self, TF, budget):
+    self.TF = TF
+    self.budget = budget
+    self.sizes = {}
+    self.used = {}
+    self.namespaces = {}
+    self.evictions = 0
+    self.evicted = collections.Counter()
+    self._clock = count()
+
+  def admit(self, namespace, fName, feature):
+    self.sizes[fName] = featureSize(feature)
+    self.namespaces[fName] = namespace
+    self.used[fName] = next(self._clock)
+    self._evict(fName)
+
+  def use(self, fName):
+    if fName in self.used:
+      self.used[fName] = next(self._clock)
+
+  def total(self):
+    return sum(self.sizes.values())
+
+  def stats(self):
+    return dict(
+        budget=self.budget,
+        total=self.total(),
+        resident=dict(self.sizes),
+        evictions=self.evictions,
+        evicted=dict(self.evicted),
+    )
+
+  def _evict(self, keep):
+    total = self.total()
+    if total <= self.budget:
+      return
+    TF = self.TF
+    for fName in sorted(self.used, key=self.used.get):
+      if total <= self.budget:
+        break
+      if fName == keep or not TF._unloadLazy(fName):
+        continue
+      self.namespaces.pop(fName).__dict__.pop(fName, None)
+      del self.used[fName]
+      total -= self.sizes.pop(fName)
+      self.evictions += 1
+      self.evicted[fName] += 1
@@ -1,3 +1,4 @@
+from array import array
 from .data import WARP
 from .helpers import itemize, compileFormats
 
@@ -19,6 +20,7 @@ class Text(object):
     self.sectionFeatureTypes = []
     self.config = config
     self.defaultFormat = DEFAULT_FORMAT
+    self._up = None
     otype = api.F.otype.v
 
     good = True
@@ -52,6 +54,8 @@ class Text(object):
 
     self._xformats = compileFormats(api.TF._cformats, api.TF.features)
     self.formats = set(self._xformats.keys())
+    # the rendered slots per format, see cacheText()
+    self._slotTexts = {}
     self.good = good
 
   def _sec0Name(self, n, lang='en'):
@@ -74,7 +78,6 @@ class Text(object):
       return ()
     F = self.api.F
     E = self.api.E
-    L = self.api.L
     slotType = F.otype.slotType
     maxSlot = F.otype.maxSlot
     eoslots = E.oslots.data
@@ -86,30 +89,27 @@ class Text(object):
       slots = eoslots[n - maxSlot - 1]
       r = slots[-1 if lastSlot else 0]
 
+    up = self._up or self._sectionUp()
+
     if nType == sTypes[0]:
       if fillup:
-        r1 = L.u(r, otype=sTypes[1])
-        r1 = r1[0] if r1 else ''
+        r1 = up(r, 1) or ''
         if lsTypes > 2:
-          r2 = L.u(r, otype=sTypes[2])
-          r2 = r2[0] if r2 else ''
+          r2 = up(r, 2) or ''
           return (n, r1, r2)
         return (n, r1)
       return (n,)
 
-    r0s = L.u(r, sTypes[0])
-    r0 = r0s[0] if r0s else None
+    r0 = up(r, 0)
 
     if nType == sTypes[1]:
       if fillup:
         if lsTypes > 2:
-          r2 = L.u(r, otype=sTypes[2])
-          r2 = r2[0] if r2 else ''
+          r2 = up(r, 2) or ''
           return (r0, n, r2)
       return (r0, n)
 
-    r1s = L.u(r, sTypes[1])
-    r1 = r1s[0] if r1s else ''
+    r1 = up(r, 1) or ''
 
     if lsTypes < 3:
       return (r0, r1)
@@ -117,11 +117,29 @@ class Text(object):
     if nType == sTypes[2]:
       return (r0, r1, n)
 
-    r2s = L.u(r, sTypes[2])
-    r2 = r2s[0] if r2s else ''
+    r2 = up(r, 2) or ''
 
     return (r0, r1, r2)
 
+  def _sectionUp(self):
+    # a function that gives the section of level i of a slot, None if there is none:
+    # looked up in the section table if it has been precomputed, see Fabric(sectionTable=True)
+    C = self.api.C
+    if hasattr(C, 'sectionTable'):
+      table = C.sectionTable.data
+      maxSlot = self.api.F.otype.maxSlot
+      self._up = lambda r, i: table[i * maxSlot + r - 1] or None
+    else:
+      L = self.api.L
+      sTypes = self.sectionTypes
+
+      def up(r, i):
+        rs = L.u(r, otype=sTypes[i])
+        return rs[0] if rs else None
+
+      self._up = up
+    return self._up
+
   def sectionFromNode(self, n, lastSlot=False, lang='en', fillup=False):
     sTuple = self.sectionTuple(n, lastSlot=lastSlot, fillup=fillup)
     if len(sTuple) == 0:
@@ -166,12 +184,74 @@ class Text(object):
         if repf is None:
           fmt = DEFAULT_FORMAT
         nodes = [nodes] if nType == slotType else eoslots[nodes - maxSlot - 1]
+      elif 0 < nodes <= maxSlot and fmt in self._slotTexts:
+        (codes, table) = self._slotTexts[fmt]
+        return table[codes[nodes]]
       else:
         return repf(nodes)
     else:
       if fmt is None:
         fmt = DEFAULT_FORMAT
+    return self._nodesText(nodes, fmt)
+
+  def textMany(self, nodes, fmt=None, descend=False):
+    # the same as [T.text(n, fmt=fmt, descend=descend) for n in nodes]
+    F = self.api.F
+    slotType = F.otype.slotType
+    maxSlot = F.otype.maxSlot
+    eoslots = self.api.E.oslots.data
+    xformats = self._xformats
+    slotTexts = self._slotTexts
+    nodes = nodes if isinstance(nodes, (list, tuple, range)) else list(nodes)
+    texts = []
+    for (n, nType) in zip(nodes, F.otype.vMany(nodes)):
+      nFmt = DEFAULT_FORMAT_TYPE.format(nType) if fmt is None else fmt
+      repf = xformats.get(nFmt, None)
+      if repf is not None and not descend:
+        if 0 < n <= maxSlot and nFmt in slotTexts:
+          (codes, table) = slotTexts[nFmt]
+          texts.append(table[codes[n]])
+        else:
+          texts.append(repf(n))
+        continue
+      if repf is None:
+        nFmt = DEFAULT_FORMAT
+      texts.append(self._nodesText((n, ) if nType == slotType else eoslots[n - maxSlot - 1], nFmt))
+    return texts
+
+  def cacheText(self, formats=None):
+    # render the slots in the given formats once, so that text() can look them up
+    xformats = self._xformats
+    if formats is None:
+      formats = sorted(xformats)
+    elif type(formats) is str:
+      formats = itemize(formats, ',')
+    maxSlot = self.api.F.otype.maxSlot
+    for fmt in formats:
+      repf = xformats.get(fmt, None)
+      if repf is None or fmt in self._slotTexts:
+        continue
+      codeFromText = {}
+      codes = array('I', [0]) * (maxSlot + 1)
+      for s in range(0, maxSlot + 1):
+        text = repf(s)
+        code = codeFromText.get(text, None)
+        if code is None:
+          code = len(codeFromText)
+          codeFromText[text] = code
+        codes[s] = code
+      self._slotTexts[fmt] = (codes, tuple(codeFromText))
+
+  def _nodesText(self, nodes, fmt):
     repf = self._xformats.get(fmt, None)
     if repf is None:
-      return ' '.join(f'{F.otype.v(n)}_{n}' for n in nodes)
+      otype = self.api.F.otype.v
+      return ' '.join(f'{otype(n)}_{n}' for n in nodes)
+    slotTexts = self._slotTexts.get(fmt, None)
+    if slotTexts is not None:
+      (codes, table) = slotTexts
+      # nodes may be an iterator, and we may need to go over it twice
+      nodes = nodes if isinstance(nodes, (list, tuple, range)) else tuple(nodes)
+      if len(nodes) == 0 or (min(nodes) >= 0 and max(nodes) < len(codes)):
+        return ''.join(map(table.__getitem__, map(codes.__getitem__, nodes)))
     return ''.join(repf(n) for n in nodes)
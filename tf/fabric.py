@@ -1,13 +1,21 @@
 import os
+import json
+import tempfile
 import collections
+from zlib import crc32
 from glob import glob
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from .parameters import VERSION, NAME, APIREF, LOCATIONS
-from .core.data import Data, WARP, WARP2_DEFAULT, MEM_MSG
+from .core.data import Data, WARP, WARP2_DEFAULT, MEM_MSG, compileFeature, saveFeature
 from .core.helpers import (
     itemize, setDir, expandDir, collectFormats, cleanName, check32, console, makeExamples
 )
 from .core.timestamp import Timestamp
-from .core.prepare import (levels, order, rank, levUp, levDown, boundary, sections)
+from .core.manifest import readManifest, writeManifest, metaEntry, knownMeta
+from .core.bundle import Bundle, writeBundle, shareBundle
+from .core.residency import Residency
+from .core.prepare import (levels, order, rank, levUp, levDown, boundary, sections, sectionTable)
 from .core.api import (
     Api,
     NodeFeature,
@@ -33,13 +41,50 @@ PRECOMPUTE = (
     (False, '__levDown__', levDown, (WARP[0], '__levUp__', '__rank__')),
     (False, '__boundary__', boundary, WARP[0:2] + ('__rank__', )),
     (True, '__sections__', sections, WARP + ('__levUp__', '__levels__')),
+    (True, '__sectionTable__', sectionTable, (WARP[0], WARP[2], '__levUp__')),
 )
 
+# precomputed data that is only made on request, see Fabric(sectionTable=True)
+OPTIONAL = {'__sectionTable__'}
+
+
+def precomputeFeature(fName, sources, otextPath, otextMeta):
+  # runs in a worker process: compute a precomputed feature into its binary
+  # the features it depends on are loaded from their binaries
+  # messages are discarded: if computing fails, the feature will be computed again
+  # by the calling process, and then the messages will be reported in the normal way
+  with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+    tm = Timestamp()
+    features = {sName: Data(path, tm) for (sName, path) in sources.items()}
+    features[WARP[2]] = Data(otextPath, tm, isConfig=True, metaData=otextMeta)
+    features[WARP[2]].dataLoaded = True
+    warpDir = features[WARP[0]].dirName
+    for (dep2, cName, method, dependencies) in PRECOMPUTE:
+      if dep2:
+        dependencies = dependencies + tuple(itemize(otextMeta.get('sectionFeatures', ''), ','))
+      features[cName] = Data(
+          f'{warpDir}/{cName}.x',
+          tm,
+          method=method,
+          dependencies=[features[dep] for dep in dependencies],
+      )
+      if cName == fName:
+        break
+    good = features[fName].load(silent=True)
+  return good
+
 
 class Fabric(object):
 
-  def __init__(self, locations=None, modules=None, silent=False):
+  def __init__(
+      self, locations=None, modules=None, silent=False, manifest=False, bundle=None, shared=False,
+      sectionTable=False,
+  ):
     self.silent = silent
+    self.manifest = manifest
+    self.sectionTable = sectionTable
+    self.bundle = bundle
+    self.shared = shared
     self.tm = Timestamp()
     self.banner = f'This is {NAME} {VERSION}'
     self.version = VERSION
@@ -76,9 +121,15 @@ Api reference : {APIREF}
         '\n\t'.join(f'{l}/{f}' for f in self.modules) for l in self.locations
     )
     self.featuresRequested = []
+    self.lazy = False
+    self.expire = None
+    self.residency = None
+    self._rankSignature = None
     self._makeIndex()
 
-  def load(self, features, add=False, silent=False):
+  def load(
+      self, features, add=False, silent=False, workers=None, lazy=False, expire=None, budget=None
+  ):
     self.tm.indent(level=0, reset=True)
     if not silent:
       self.tm.info('loading features ...')
@@ -90,6 +141,11 @@ Api reference : {APIREF}
         self.featuresRequested += featuresRequested
       else:
         self.featuresRequested = featuresRequested
+        self.lazy = lazy
+        self.expire = expire
+        self.residency = None if budget is None else Residency(self, budget)
+      if workers is not None and workers > 1:
+        self._compileParallel(featuresRequested, workers, silent)
       for fName in list(WARP):
         self._loadFeature(fName, optional=fName == WARP[2], silent=silent)
     if self.good:
@@ -122,10 +178,14 @@ Api reference : {APIREF}
         self.sectionsOK = False
 
     if self.good:
+      if workers is not None and workers > 1:
+        self._precomputeParallel(workers, silent)
       self._precompute()
     if self.good:
       for fName in self.featuresRequested:
         self._loadFeature(fName, silent=silent)
+    if self.manifest:
+      self._updateManifests(silent)
     if not self.good:
       self.tm.indent(level=0)
       self.tm.error('Not all features could be loaded/computed')
@@ -162,6 +222,8 @@ Api reference : {APIREF}
       else:
         dest = nodes
       dest.add(fName)
+    if self.manifest:
+      self._updateManifests(silent)
     if not silent:
       self.tm.info(
           'Feature overview: {} for nodes; {} for edges; {} configs; {} computed'.format(
@@ -176,11 +238,64 @@ Api reference : {APIREF}
       return dict((kind, tuple(sorted(kindSet)))
                   for (kind, kindSet) in sorted(self.featureSets.items(), key=lambda x: x[0]))
 
+  def saveBundle(self, path, features=None, silent=False):
+    if features is None:
+      features = [fName for (fName, fObj) in self.features.items() if not fObj.method]
+    if not self.load(features, silent=silent):
+      return False
+    try:
+      writeBundle(
+          path,
+          {
+              fName: fObj
+              for (fName, fObj) in self.features.items()
+              if fObj.dataLoaded or fObj.isConfig
+          },
+      )
+    except OSError as e:
+      self.tm.error(f'Cannot write bundle "{path}" because: {str(e)}')
+      return False
+    if not silent:
+      self.tm.info(f'Bundle written to {path}')
+    return True
+
+  def shareBundle(self, name=None, features=None, silent=False):
+    # the bundle of this dataset in a new shared memory segment,
+    # made from the bundle file or else from a temporary bundle of the features
+    try:
+      if self.bundle is not None and not self.shared:
+        segment = shareBundle(self.bundle, name=name)
+      else:
+        with tempfile.TemporaryDirectory() as tmpDir:
+          path = f'{tmpDir}/shared.tfx'
+          if not self.saveBundle(path, features=features, silent=True):
+            return None
+          segment = shareBundle(path, name=name)
+    except OSError as e:
+      self.tm.error(f'Cannot share bundle because: {str(e)}')
+      return None
+    if not silent:
+      self.tm.info(f'Bundle shared as {segment.name}')
+    return segment
+
+  def loadProfile(self, path=None):
+    profile = sorted(
+        (record for fObj in self.features.values() for record in fObj.profile),
+        key=lambda record: record['start'],
+    )
+    if path is not None:
+      try:
+        with open(path, 'w', encoding='utf8') as fh:
+          json.dump(profile, fh, ensure_ascii=False, indent=1)
+      except OSError as e:
+        self.tm.error(f'Cannot write load profile "{path}" because: {str(e)}')
+    return profile
+
   def clearCache(self):
     for (fName, fObj) in self.features.items():
       fObj.cleanDataBin()
 
-  def save(self, nodeFeatures={}, edgeFeatures={}, metaData={}, module=None):
+  def save(self, nodeFeatures={}, edgeFeatures={}, metaData={}, module=None, workers=None):
     good = True
     self.tm.indent(level=0, reset=True)
     self._getWriteLoc(module=module)
@@ -269,6 +384,7 @@ Api reference : {APIREF}
       if good:
         self.tm.info(f'OK: {WARP[1]} is valid')
 
+    fObjs = []
     for (fName, data, isEdge, isConfig) in todo:
       edgeValues = False
       fMeta = {}
@@ -287,10 +403,19 @@ Api reference : {APIREF}
           isConfig=isConfig,
           edgeValues=edgeValues,
       )
-      tag = 'config' if isConfig else 'edge' if isEdge else 'node'
+      fObjs.append(fObj)
+    written = (
+        self._saveParallel(fObjs, workers)
+        if workers is not None and workers > 1 else
+        set()
+    )
+    for fObj in fObjs:
+      tag = 'config' if fObj.isConfig else 'edge' if fObj.isEdge else 'node'
       if fObj.save(
-          nodeRanges=fName == WARP[0],
+          nodeRanges=fObj.fileName == WARP[0],
           overwrite=True,
+          binary=True,
+          writtenElsewhere=fObj.fileName in written,
       ):
         total[tag] += 1
       else:
@@ -311,6 +436,37 @@ Api reference : {APIREF}
       good = False
     return good
 
+  def _saveParallel(self, fObjs, workers):
+    # write the biggest features first, so that the workers finish at about the same time
+    # features that fail here will be written again in the normal way
+    todo = sorted(
+        (fObj for fObj in fObjs if not fObj.isConfig),
+        key=lambda fObj: -len(fObj.data),
+    )
+    if len(todo) < 2:
+      return set()
+    if not self.silent:
+      self.tm.info(f'writing {len(todo)} features with {workers} workers ...')
+    try:
+      with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as executor:
+        futures = {
+            executor.submit(
+                saveFeature,
+                fObj.path,
+                fObj.data,
+                fObj.metaData,
+                fObj.isEdge,
+                fObj.isConfig,
+                fObj.edgeValues,
+                fObj.fileName == WARP[0],
+            ): fObj.fileName
+            for fObj in todo
+        }
+        return {fName for (future, fName) in futures.items() if future.result()}
+    except Exception as e:
+      self.tm.info(f'writing in parallel failed ({e}), continuing one by one', tm=False)
+      return set()
+
   def exportMQL(self, mqlName, mqlDir):
     self.tm.indent(level=0, reset=True)
     mqlDir = expandDir(self, mqlDir)
@@ -336,16 +492,153 @@ Api reference : {APIREF}
     else:
       if not self.features[fName].load(silent=silent or (fName not in self.featuresRequested)):
         self.good = False
+      else:
+        self._sortEdges(fName)
+
+  def _sortEdges(self, fName):
+    # store the rows of edge features in canonical order, once rank is known
+    fObj = self.features[fName]
+    rankObj = self.features.get('__rank__', None)
+    if not fObj.isEdge or rankObj is None or not rankObj.dataLoaded:
+      return
+    fObj.sortEdges(rankObj.data, self._signature(rankObj.data))
+
+  def _signature(self, rank):
+    if self._rankSignature is None or self._rankSignature[0] is not rank:
+      self._rankSignature = (rank, crc32(rank))
+    return self._rankSignature[1]
+
+  def _valueIndex(self, fName):
+    # the value index of a node feature, see Data.valueIndex()
+    fObj = self.features[fName]
+    orderObj = self.features.get('__order__', None)
+    rankObj = self.features.get('__rank__', None)
+    if (
+        not fObj.dataLoaded or orderObj is None or not orderObj.dataLoaded or
+        rankObj is None or not rankObj.dataLoaded
+    ):
+      return None
+    return fObj.valueIndex(orderObj.data, self._signature(rankObj.data))
+
+  def _nodeFeature(self, api, fName):
+    fObj = self.features[fName]
+    return NodeFeature(api, fObj.data, makeIndex=lambda: self._valueIndex(fName))
+
+  def _compileParallel(self, featuresRequested, workers, silent):
+    fNames = set(WARP) | set(featuresRequested)
+    if WARP[2] in self.features:
+      otextMeta = self.features[WARP[2]].metaData
+      fNames |= set(itemize(otextMeta.get('sectionFeatures', ''), ','))
+      fNames |= set(collectFormats(otextMeta)[1])
+    # otext and its language variants are config features: there is nothing to compile
+    todo = sorted(
+        fName for fName in fNames
+        if fName in self.features and fName != WARP[2] and not fName.startswith(WARP[2] + '@') and
+        not self.features[fName].method and self.features[fName].needsCompiling()
+    )
+    if len(todo) < 2:
+      return
+    if not silent:
+      self.tm.info(f'compiling {len(todo)} features with {workers} workers ...')
+    try:
+      with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as executor:
+        results = list(executor.map(compileFeature, [self.features[fName].path for fName in todo]))
+    except Exception as e:
+      # features that are not yet compiled will be compiled in the normal way
+      self.tm.info(f'compiling in parallel failed ({e}), continuing one by one', tm=False)
+      return
+    for (fName, good) in zip(todo, results):
+      if good:
+        self.features[fName].setCompiledElsewhere()
+
+  def _precomputeParallel(self, workers, silent):
+    todo = [
+        fName for (fName, dep2) in self.precomputeList
+        if (self.sectionsOK or not dep2) and self.features[fName].needsCompiling()
+    ]
+    if len(todo) < 2:
+      return
+    waitFor = {
+        fName: {dep.fileName for dep in self.features[fName].dependencies} & set(todo)
+        for fName in todo
+    }
+    otext = self.features[WARP[2]]
+    sourceNames = WARP[0:2] + tuple(itemize(otext.metaData.get('sectionFeatures', ''), ','))
+    sources = {fName: self.features[fName].path for fName in sourceNames if fName in self.features}
+    if not silent:
+      self.tm.info(f'computing {len(todo)} features with {workers} workers ...')
+    done = set()
+    try:
+      with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as executor:
+        pending = list(todo)
+        running = {}
+        while pending or running:
+          for fName in [fName for fName in pending if waitFor[fName] <= done]:
+            pending.remove(fName)
+            future = executor.submit(precomputeFeature, fName, sources, otext.path, otext.metaData)
+            running[future] = fName
+          if not running:
+            # the remaining features depend on a feature that could not be computed
+            break
+          (finished, notFinished) = wait(running, return_when=FIRST_COMPLETED)
+          for future in finished:
+            fName = running.pop(future)
+            if future.result():
+              done.add(fName)
+    except Exception as e:
+      # features that are not yet computed will be computed in the normal way
+      self.tm.info(f'computing in parallel failed ({e}), continuing one by one', tm=False)
+    for fName in done:
+      self.features[fName].setCompiledElsewhere()
+
+  def _loadLazy(self, api, fName, isEdge):
+    fObj = self.features.get(fName, None)
+    if fObj is None or fObj.method:
+      return None
+    if not fObj.load(metaOnly=True, silent=True):
+      return None
+    if fObj.isConfig or bool(fObj.isEdge) != isEdge:
+      return None
+    if not fObj.load(silent=True):
+      return None
+    self._sortEdges(fName)
+    if fName not in self.featuresRequested:
+      self.featuresRequested.append(fName)
+    return EdgeFeature(api, fObj.data, fObj.edgeValues) if isEdge else self._nodeFeature(api, fName)
+
+  def _unloadLazy(self, fName):
+    if fName in WARP or fName in self._formatFeats:
+      return False
+    if WARP[2] in self.features:
+      otextMeta = self.features[WARP[2]].metaData
+      if fName in itemize(otextMeta.get('sectionFeatures', ''), ','):
+        return False
+    self.features[fName].unload()
+    if fName in self.featuresRequested:
+      self.featuresRequested.remove(fName)
+    return True
 
   def _makeIndex(self):
     self.features = {}
     self.featuresIgnored = {}
+    self._manifests = {}
+    self._bundle = None
     tfFiles = {}
-    for loc in self.locations:
+    if self.bundle is not None:
+      self._indexBundle()
+    for loc in self.locations if self.bundle is None else ():
       for mod in self.modules:
-        files = glob(f'{loc}/{mod}/*.tf')
+        manifest = None
+        if self.manifest:
+          dirName = os.path.split(f'{loc}/{mod}/')[0]
+          manifest = readManifest(dirName)
+          self._manifests[dirName] = manifest
+        if manifest is None:
+          files = glob(f'{loc}/{mod}/*.tf')
+        else:
+          files = [f'{loc}/{mod}/{fName}.tf' for fName in manifest['files']]
         for f in files:
-          if not os.path.isfile(f):
+          if manifest is None and not os.path.isfile(f):
             continue
           (dirF, fileF) = os.path.split(f)
           (fName, ext) = os.path.splitext(fileF)
@@ -356,11 +649,12 @@ Api reference : {APIREF}
         if featurePath != chosenFPath:
           self.featuresIgnored.setdefault(fName, []).append(featurePath)
       self.features[fName] = Data(chosenFPath, self.tm)
+      self._setKnownModified(self.features[fName], fName)
     self._getWriteLoc()
     if not self.silent:
       self.tm.info(
           '{} features found and {} ignored'.format(
-              len(tfFiles),
+              len(self.features),
               sum(len(x) for x in self.featuresIgnored.values()),
           ), tm=False
       )
@@ -392,6 +686,8 @@ Api reference : {APIREF}
       thisGood = True
       if dep2 and WARP[2] not in self.features:
         continue
+      if fName in OPTIONAL and not self.sectionTable:
+        continue
       if dep2:
         otextMeta = self.features[WARP[2]].metaData
         sectionFeats = tuple(itemize(otextMeta.get('sectionFeatures', ''), ','))
@@ -408,9 +704,69 @@ Api reference : {APIREF}
           method=method,
           dependencies=[self.features.get(dep, None) for dep in dependencies],
       )
+      self._setKnownModified(self.features[fName], fName)
+      if self._bundle is not None:
+        self._bundle.attach(self.features[fName], fName)
       self.precomputeList.append((fName, dep2))
     self.good = good
 
+  def _indexBundle(self):
+    try:
+      bundle = Bundle(self.bundle, shared=self.shared)
+    except OSError as e:
+      self.tm.error(f'Cannot read bundle "{self.bundle}" because: {str(e)}')
+      return
+    if not bundle.good:
+      self.tm.error(f'Not a bundle: "{self.bundle}"')
+      return
+    self._bundle = bundle
+    bundleDir = os.path.dirname(os.path.abspath(self.bundle))
+    computed = {x[1] for x in PRECOMPUTE}
+    for fName in bundle.features:
+      if fName not in computed:
+        self.features[fName] = Data(f'{bundleDir}/{fName}.tf', self.tm)
+        bundle.attach(self.features[fName], fName)
+
+  def _setKnownModified(self, fObj, fName):
+    manifest = self._manifests.get(fObj.dirName, None)
+    if manifest is not None:
+      fObj.knownModified = (
+          None if fObj.method else manifest['files'].get(fName, None),
+          manifest['bins'].get(fName, None),
+      )
+      fObj.knownSizes = (
+          None if fObj.method else manifest['fileSizes'].get(fName, None),
+          manifest['binSizes'].get(fName, None),
+      )
+      if not fObj.method:
+        fObj.knownMeta = knownMeta(manifest, fName)
+
+  def _updateManifests(self, silent):
+    # compiling features has made the manifests of their directories stale,
+    # and the metadata of features that have been read for the first time can be added
+    featureDirs = {fObj.dirName for fObj in self.features.values()}
+    for dirName in self._manifests:
+      if dirName not in featureDirs:
+        continue
+      meta = {}
+      fresh = []
+      for (fName, fObj) in self.features.items():
+        if fObj.dirName != dirName or fObj.method:
+          continue
+        if fObj.knownMeta is not None:
+          meta[fName] = fObj.knownMeta
+        elif fObj.readMeta is not None and os.path.exists(fObj.path):
+          meta[fName] = metaEntry(fObj)
+          fresh.append(fObj)
+      if not fresh and readManifest(dirName) is not None:
+        continue
+      self._manifests[dirName] = None
+      if writeManifest(dirName, meta=meta):
+        for fObj in fresh:
+          fObj.knownMeta = meta[fObj.fileName]
+      elif not silent:
+        self.tm.info(f'Cannot write cache manifest in {dirName}', tm=False)
+
   def _getWriteLoc(self, dirName=None, module=None):
     writeLoc = dirName if dirName is not None else '' if len(self.locations
                                                              ) == 0 else self.locations[-1]
@@ -461,15 +817,15 @@ Api reference : {APIREF}
             elif fObj.isEdge:
               setattr(api.E, fName, EdgeFeature(api, fObj.data, fObj.edgeValues))
             else:
-              setattr(api.F, fName, NodeFeature(api, fObj.data))
+              setattr(api.F, fName, self._nodeFeature(api, fName))
           else:
             if (fName in WARP or fName in sectionFeats or fName in self._formatFeats):
               continue
             elif fObj.isEdge:
-              if hasattr(api.E, fName):
+              if fName in api.E.__dict__:
                 delattr(api.E, fName)
             else:
-              if hasattr(api.F, fName):
+              if fName in api.F.__dict__:
                 delattr(api.F, fName)
             fObj.unload()
     addSortKey(api)
@@ -506,15 +862,15 @@ Api reference : {APIREF}
                 setattr(api.E, fName, EdgeFeature(api, fObj.data, fObj.edgeValues))
             else:
               if not hasattr(api.F, fName):
-                setattr(api.F, fName, NodeFeature(api, fObj.data))
+                setattr(api.F, fName, self._nodeFeature(api, fName))
           else:
             if (fName in WARP or fName in sectionFeats or fName in self._formatFeats):
               continue
             elif fObj.isEdge:
-              if hasattr(api.E, fName):
+              if fName in api.E.__dict__:
                 delattr(api.E, fName)
             else:
-              if hasattr(api.F, fName):
+              if fName in api.F.__dict__:
                 delattr(api.F, fName)
             fObj.unload()
     self.tm.indent(level=0)
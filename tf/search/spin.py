@@ -13,6 +13,7 @@ from .syntax import (
     QEND,
 )
 from ..core.helpers import project
+from ..core.columns import CodedColumn
 
 # SPINNING ###
 
@@ -25,48 +26,89 @@ def _spinAtom(searchExe, q):
 
   (otype, features, src, quantifiers) = qnodes[q]
   featureList = sorted(features.items())
-  yarn = set()
   nodeSet = sets[otype] if sets is not None and otype in sets else F.otype.s(otype)
-  for n in nodeSet:
-    good = True
-    for (ft, val) in featureList:
-      fval = Fs(ft).v(n)
-      if val is None:
-        if fval is not None:
-          good = False
-          break
-      elif val is True:
-        if fval is None:
-          good = False
-          break
-      elif isinstance(val, types.FunctionType):
-        if not val(fval):
-          good = False
-          break
-      elif isinstance(val, reTp):
-        if fval is None or not val.search(fval):
-          good = False
-          break
+  (nodeSet, featureList) = _filterIndexed(Fs, nodeSet, featureList)
+  (nodeSet, featureList) = _filterCoded(Fs, nodeSet, featureList)
+  # check the conditions one by one, each on the nodes that have passed the previous ones,
+  # fetching the feature values of all those nodes at once
+  nodes = list(nodeSet)
+  for (ft, val) in featureList:
+    if not nodes:
+      break
+    fvals = Fs(ft).vMany(nodes)
+    if val is None:
+      nodes = [n for (n, fval) in zip(nodes, fvals) if fval is None]
+    elif val is True:
+      nodes = [n for (n, fval) in zip(nodes, fvals) if fval is not None]
+    elif isinstance(val, types.FunctionType):
+      nodes = [n for (n, fval) in zip(nodes, fvals) if val(fval)]
+    elif isinstance(val, reTp):
+      nodes = [n for (n, fval) in zip(nodes, fvals) if fval is not None and val.search(fval)]
+    else:
+      (ident, val) = val
+      if ident is None and val is True:
+        pass
+      elif ident:
+        nodes = [n for (n, fval) in zip(nodes, fvals) if fval in val]
       else:
-        (ident, val) = val
-        if ident is None and val is True:
-          pass
-        elif ident:
-          if fval not in val:
-            good = False
-            break
-        else:
-          if fval in val:
-            good = False
-            break
-    if good:
-      yarn.add(n)
+        nodes = [n for (n, fval) in zip(nodes, fvals) if fval not in val]
+  yarn = set(nodes)
   if quantifiers:
     for quantifier in quantifiers:
       yarn = _doQuantifier(searchExe, yarn, src, quantifier)
   searchExe.yarns[q] = yarn
 
 
+def _filterIndexed(Fs, nodeSet, featureList):
+  # the most selective equality condition on a feature with a value index
+  # is met by looking up the nodes with the required values,
+  # if there are fewer of those than nodes to check
+  best = None
+  for (i, (ft, val)) in enumerate(featureList):
+    if type(val) is not tuple or val[0] is not True or type(val[1]) is bool or None in val[1]:
+      continue
+    feature = Fs(ft)
+    if not hasattr(feature, 'valueIndex'):
+      continue
+    index = feature.valueIndex()
+    size = sum(index.count(v) for v in val[1])
+    if best is None or size < best[0]:
+      best = (size, i, index, val[1])
+  if best is None or best[0] >= len(nodeSet):
+    return (nodeSet, featureList)
+  (size, i, index, values) = best
+  if type(nodeSet) not in {range, set, frozenset}:
+    nodeSet = set(nodeSet)
+  nodes = [n for v in values for n in index.get(v, ()) if n in nodeSet]
+  return (nodes, featureList[0:i] + featureList[i + 1:])
+
+
+def _filterCoded(Fs, nodeSet, featureList):
+  # (in)equality conditions on dictionary encoded features are checked
+  # by comparing codes instead of values
+  codedConditions = []
+  otherConditions = []
+  for (ft, val) in featureList:
+    data = Fs(ft).data
+    if type(data) is CodedColumn and type(val) is tuple and type(val[1]) is not bool:
+      (ident, values) = val
+      codes = data.codesOf(values)
+      if None in values:
+        codes.add(0)
+      codedConditions.append((data.code, ident, codes))
+    else:
+      otherConditions.append((ft, val))
+  if not codedConditions:
+    return (nodeSet, featureList)
+  for (code, ident, codes) in codedConditions:
+    nodeSet = (
+        [n for n in nodeSet if code(n) in codes]
+        if ident else
+        [n for n in nodeSet if code(n) not in codes]
+    )
+  return (nodeSet, otherConditions)
+
+
 def _doQuantifier(searchExe, yarn, atom, quantifier):
   from .searchexe import SearchExe
   (quKind, quTemplates, parentName, ln) = quantifier